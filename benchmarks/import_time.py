@@ -0,0 +1,101 @@
+'''
+Times how long spgt takes to import, to track the startup time of the CLI across commits, e.g.
+	
+	python benchmarks/import_time.py --csv import_times.csv
+
+Each module is imported in a fresh `python -X importtime` process several times,
+and the median of its cumulative import time is reported, along with the modules
+which took longest. Each run appends one row per module to the CSV file.
+'''
+import argparse
+import datetime
+import os
+import statistics
+import subprocess
+import sys
+
+from typing import Dict, List, Tuple
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# spgt.__main__ is all a run on a cached instance imports, and spgt.translator is added when translating.
+# Modules already imported by the interpreter on startup are not counted.
+MODULES = ["spgt.__main__", "spgt.translator", "spgt.solver"]
+
+def import_times(module: str) -> Tuple[int, Dict[str, int]]:
+	'''
+	Imports module in a fresh interpreter, returning its cumulative import time
+	and that of each module it imported directly, in microseconds.
+	'''
+	proc = subprocess.run(
+		[sys.executable, "-X", "importtime", "-c", f"import {module}"],
+		stdout=subprocess.DEVNULL,
+		stderr=subprocess.PIPE,
+		text=True,
+		check=True
+	)
+	imports = []
+	for line in proc.stderr.splitlines():
+		# import time: self [us] | cumulative | imported package
+		if not line.startswith("import time:") or "[us]" in line:
+			continue
+		_, cumulative, name = line[len("import time:"):].split("|")
+		# Nesting is shown by two spaces per level, after the first.
+		depth = (len(name) - len(name.lstrip()) - 1) // 2
+		imports.append((depth, name.strip(), int(cumulative)))
+	
+	# Modules are listed after everything they import.
+	i = max(i for i, (_, name, _) in enumerate(imports) if name == module)
+	depth, _, total = imports[i]
+	children = {}
+	for child_depth, name, cumulative in reversed(imports[:i]):
+		if child_depth <= depth:
+			break
+		if child_depth == depth + 1:
+			children[name] = cumulative
+	return total, children
+
+def git_commit() -> str:
+	proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=THIS_DIR,
+						  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+	return proc.stdout.strip()
+
+def time_module(module: str, repeats: int, top: int) -> Dict:
+	runs = sorted(import_times(module) for _ in range(repeats))
+	totals = [total for total, _ in runs]
+	# The modules it imported directly which took longest, in the median run.
+	_, children = runs[repeats // 2]
+	slowest = sorted(((t, name) for name, t in children.items()), reverse=True)[:top]
+	return {
+		"module": module,
+		"median_ms": statistics.median(totals) / 1000,
+		"min_ms": min(totals) / 1000,
+		"slowest": [(name, t / 1000) for t, name in slowest],
+	}
+
+def write_csv(path: str, results: List[Dict]):
+	new_file = not os.path.isfile(path)
+	date = datetime.datetime.now().isoformat(timespec="seconds")
+	commit = git_commit()
+	with open(path, "a") as f:
+		if new_file:
+			f.write("date,commit,module,median_ms,min_ms\n")
+		for r in results:
+			f.write(f"{date},{commit},{r['module']},{r['median_ms']:.1f},{r['min_ms']:.1f}\n")
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Times how long spgt's modules take to import.")
+	parser.add_argument("--modules", nargs='+', default=MODULES, help="The modules to import.")
+	parser.add_argument("--repeats", type=int, default=7, help="How many fresh processes to import each module in.")
+	parser.add_argument("--top", type=int, default=5, help="How many of the slowest imported modules to show.")
+	parser.add_argument("--csv", type=str, help="A file to append the results to, with the date and git commit.")
+	args = parser.parse_args()
+	
+	results = [time_module(m, args.repeats, args.top) for m in args.modules]
+	for r in results:
+		print(f"{r['module']}: {r['median_ms']:.1f}ms median, {r['min_ms']:.1f}ms fastest.")
+		for name, ms in r["slowest"]:
+			print(f"\t{name}: {ms:.1f}ms")
+	
+	if args.csv is not None:
+		write_csv(args.csv, results)
@@ -0,0 +1,53 @@
+'''
+Writes acrobatics problems with more locations than the ones in `domains/acrobatics`,
+to benchmark grounding on larger instances, e.g.
+	
+	python benchmarks/scale_acrobatics.py /tmp/scaled --sizes 512 1024 2048
+	spgt benchmark /tmp/scaled --translate_only
+'''
+import argparse
+import os
+import shutil
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+DOMAIN = os.path.join(THIS_DIR, "domains", "acrobatics", "domain.pddl")
+
+def acrobatics_problem(n: int) -> str:
+	'''
+	An acrobatics problem with n locations in a line, matching the layout of p01 to p08.
+	'''
+	locations = [f"p{i}" for i in range(n)]
+	fwd = " ".join(f"(next-fwd {a} {b})" for a, b in zip(locations, locations[1:]))
+	bwd = " ".join(f"(next-bwd {b} {a})" for a, b in zip(locations, locations[1:]))
+	return f"""(define (problem acrobatics-{n})
+(:domain acrobatics)
+(:objects
+{" ".join(locations)} - location
+)
+(:init
+{fwd}
+{bwd}
+(ladder-at p0)
+(position p0)
+)
+
+(:goal
+(and (up) (position {locations[-1]}) )
+)
+
+)
+"""
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Writes scaled up acrobatics problems.")
+	parser.add_argument("output", help="The directory to write them to. An `acrobatics` subdirectory is created in it.")
+	parser.add_argument("--sizes", type=int, nargs='+', default=[512, 1024, 2048, 4096],
+					 help="The number of locations in each problem.")
+	args = parser.parse_args()
+	
+	domain_dir = os.path.join(args.output, "acrobatics")
+	os.makedirs(domain_dir, exist_ok=True)
+	shutil.copy(DOMAIN, os.path.join(domain_dir, "domain.pddl"))
+	for n in args.sizes:
+		with open(os.path.join(domain_dir, f"p{n:05}.pddl"), "w") as f:
+			f.write(acrobatics_problem(n))
@@ -1,29 +1,63 @@
+from __future__ import annotations
+
 import argparse
+import json
 import os
+import sys
+
+from typing import List, Dict, TYPE_CHECKING
 
-from typing import List
+# The translator is slow to import, as it needs pddl, and is not needed for cached instances.
+if TYPE_CHECKING:
+	from spgt.translator import Translator, LiftedDomain
 
-from spgt.translator import Translator
-from spgt.solver import solve
+from spgt.solver import solve, parse_controller
+from spgt.cache import TranslationCache, CachedTranslation
 from spgt.base.logic import Formula
 
 from spgt import names
 
-from time import time
+from time import time, perf_counter
 
-def get_args():
+def get_args(batch: bool = False, argv: List[str] | None = None):
+	'''
+	Parses the command line arguments.
+	In batch mode many problems are given instead of one.
+	'''
 	parser: argparse.ArgumentParser = argparse.ArgumentParser(
-		"spgt",
+		"spgt batch" if batch else "spgt",
 		"Small Plans for Good Times (SPGT): A compact planner for temporal FOND plans in ASP."
 	)
 	
 	parser.add_argument("domain")
-	parser.add_argument("problem")
+	if batch:
+		parser.add_argument("problems", nargs='+')
+		parser.add_argument('--workers',
+						type=int,
+						default=os.cpu_count(),
+						help="How many problems to solve at once.")
+	else:
+		parser.add_argument("problem")
 	
 	parser.add_argument('--subprocess',
 					action='store_true',
 					help="Whether to run clingo as a CLI subprocess or through the Python API.")
 	
+	parser.add_argument('--incremental',
+					action='store_true',
+					help="Keep one clingo Control across controller sizes, grounding only the new node each step.")
+	
+	parser.add_argument('--jobs',
+					type=int,
+					default=1,
+					help="How many controller sizes to try at once, each in its own clingo subprocess.")
+	
+	parser.add_argument('--portfolio',
+					type=int,
+					default=1,
+					help="""How many clingo configurations to race on each controller size,
+					each in its own subprocess. The winners are appended to portfolio.csv.""")
+	
 	parser.add_argument('--clingo_path',
 					 type=str,
 					 default='clingo',
@@ -47,10 +81,59 @@ def get_args():
 	parser.add_argument('-gr', '--graph',
 					 action='store_true')
 	
+	parser.add_argument('--save_instance',
+					 action='store_true',
+					 help="Also save the translated instance to instance.lp, for debugging.")
+	
+	parser.add_argument('--full_model',
+					 action='store_true',
+					 help="Save every atom of the stable model to output.lp, for debugging, rather than only the controller.")
+	
+	parser.add_argument('--symbols',
+					 action='store_true',
+					 help="Hand the translated instance to clingo as terms through its backend, rather than as text.")
+	
+	parser.add_argument('--integer_ids',
+					 action='store_true',
+					 help="""Name actions, effects, variables and values by integers in the translated instance.
+					 The names are written to symbols.json, and used again in output.lp and graphs.""")
+	
+	parser.add_argument('--stream',
+					 action='store_true',
+					 help="""Ground actions one at a time as the instance is written to instance.lp,
+					 so memory use does not grow with the number of actions, unless --integer_ids is also given.
+					 Unreachable actions are not pruned.""")
+	
+	parser.add_argument('--cache_dir',
+					 type=str,
+					 help="""A directory to cache translated instances in.
+					 Instances whose domain, problem and goal are unchanged are not translated again.""")
+	
+	parser.add_argument('--cache_size',
+					 type=float,
+					 default=1024,
+					 help="The most space the cache may take up, in megabytes.")
+	
+	parser.add_argument('--stats_json',
+					 type=str,
+					 help="""A file to write a report of the time spent in each phase to,
+					 along with clingo's statistics for each controller size.""")
+	
 	parser.add_argument('--start_size',
 					 type=int,
 					 default=1)
 	
+	parser.add_argument('--search',
+					 choices=['linear', 'gallop'],
+					 default='linear',
+					 help="""How to search for the controller size.
+					 linear tries every size in turn, gallop probes exponentially
+					 larger sizes and then binary searches between them.""")
+	
+	parser.add_argument('--first_sat',
+					 action='store_true',
+					 help="Stop at the first size with a solution, without minimising it.")
+	
 	parser.add_argument('--ppltl', action='store_true')
 	parser.add_argument('--strong', action='store_true')
 	parser.add_argument('--time_limit',
@@ -59,15 +142,27 @@ def get_args():
 	
 	parser.set_defaults(
 		graph=False,
+		save_instance=False,
+		full_model=False,
+		symbols=False,
+		integer_ids=False,
+		stream=False,
 		ppltl=False,
 		strong=False,
+		incremental=False,
+		first_sat=False,
 		clingo_args=""
 	)
 	
-	args = parser.parse_args()
+	args = parser.parse_args(argv)
 	
 	args.domain = os.path.abspath(args.domain)
-	args.problem = os.path.abspath(args.problem)
+	if batch:
+		args.problems = [os.path.abspath(p) for p in args.problems]
+		if args.goal in ['?', 'TELLME']:
+			parser.error("goals cannot be chosen interactively in batch mode.")
+	else:
+		args.problem = os.path.abspath(args.problem)
 	args.temp_dir = os.path.abspath(args.temp_dir)
 	
 	if not os.path.isdir(args.temp_dir):
@@ -75,6 +170,12 @@ def get_args():
 	
 	return args
 
+def parse_goal(goal: str) -> Formula:
+	'''
+	Parses a goal given on the command line, simplified and in NNF.
+	'''
+	return Formula.simplify_constants(Formula.NNF(Formula.parse(goal)))
+
 def set_goal(arg_goal: str, t: Translator) -> Formula:
 	'''
 	Overwrites the goal of t based on arg_goal.
@@ -82,7 +183,7 @@ def set_goal(arg_goal: str, t: Translator) -> Formula:
 	then asks for command line input of new goal.
 	'''
 	if not arg_goal in ['?', 'TELLME']:
-		t.overwrite_goal(Formula.parse(arg_goal))
+		t.overwrite_goal(parse_goal(arg_goal))
 		return
 	
 	# Explain the options and ask them for the goal.
@@ -100,7 +201,7 @@ def set_goal(arg_goal: str, t: Translator) -> Formula:
 		print(f"\t{symb}: {uop}")
 	
 	form_str = input("Please provide the desired goal formula: ")
-	t.overwrite_goal(Formula.parse(form_str))
+	t.overwrite_goal(parse_goal(form_str))
 	pass
 	
 def parse_clingo_args(args: str) -> List[str]:
@@ -109,35 +210,163 @@ def parse_clingo_args(args: str) -> List[str]:
 	
 	return args.split(' ')
 
-def main():
-	args = get_args()
-	args.clingo_args = parse_clingo_args(args.clingo_args)
-	
+def emit_instance(args, t: Translator) -> str | List:
+	'''
+	Returns the translated instance as clingo terms if `args.symbols` is set, or as ASP otherwise.
+	If `args.integer_ids` is set names are replaced by their integers in `t.symbols`.
+	'''
+	if args.symbols:
+		return list(t.as_integer_symbols() if args.integer_ids else t.as_symbols())
+	if args.integer_ids:
+		return "".join(f"{symbol}.\n" for symbol in t.as_integer_symbols())
+	return "".join(t.as_ASP())
+
+def write_instance(args, t: Translator, path: str):
+	'''
+	Writes the translated instance to path as it is produced, without holding all of it in memory.
+	If `args.integer_ids` is set names are replaced by their integers in `t.symbols`.
+	'''
+	with open(path, "w+") as f:
+		if args.integer_ids:
+			f.writelines(f"{symbol}.\n" for symbol in t.as_integer_symbols())
+		else:
+			f.writelines(t.as_ASP())
+
+def write_stats(args, phases: Dict[str, float], steps: List[Dict], total: float, output: List[str]):
+	'''
+	Writes the timings of each phase, and clingo's statistics for each size tried, to `args.stats_json`.
+	'''
+	report = {
+		"domain": args.domain,
+		"problem": args.problem,
+		"goal": args.goal,
+		"solved": bool(output),
+		"total": total,
+		"phases": phases,
+		"steps": steps,
+	}
+	with open(args.stats_json, "w+") as f:
+		json.dump(report, f, indent=1)
+
+def solve_problem(args, lifted: LiftedDomain | None = None) -> List[str]:
+	'''
+	Translates and solves `args.problem`, saving the controller in `args.temp_dir`.
+	`lifted` may be given to reuse a domain which is already parsed and normalised.
+	returns the output of the solver.
+	'''
 	start_time = time()
+	# Python side phase timings, for --stats_json.
+	phases = {}
 	
-	translator: Translator = Translator(args.domain, args.problem)
-	if not args.goal is None:
-		new_start = time()
-		set_goal(args.goal, translator)
-		# subtract the time spent choosing the goal.
-		start_time -= time() - new_start
-	
-	# The translator may already contain, or have been updated
-	# to contain ppltl formulae, in which case we need to use the
-	# correct regressor and planner.
-	if translator.is_ppltl():
-		args.ppltl = True
+	if not os.path.isdir(args.temp_dir):
+		os.makedirs(args.temp_dir)
 	
 	instance_loc = os.path.abspath(os.path.join(args.temp_dir, "instance.lp"))
 	output_loc = os.path.abspath(os.path.join(args.temp_dir, "output.lp"))
+	controller_loc = os.path.abspath(os.path.join(args.temp_dir, "controller.json"))
+	symbols_loc = os.path.abspath(os.path.join(args.temp_dir, "symbols.json"))
 	
-	translator.save_ASP(instance_loc)
+	# Goals chosen interactively are not known until after translation,
+	# so they cannot be looked up. Streamed instances are never held whole, so are not cached.
+	cache, cache_key, cached = None, None, None
+	if args.cache_dir is not None and not args.goal in ['?', 'TELLME'] and not args.stream:
+		cache = TranslationCache(args.cache_dir, int(args.cache_size * 2**20))
+		cache_key = TranslationCache.key(args.domain, args.problem, args.goal, args.integer_ids)
+		t = perf_counter()
+		cached = cache.get(cache_key)
+		phases["cache_lookup"] = perf_counter() - t
+	
+	if cached is not None:
+		print("Using cached translation.")
+		instance = cached.instance
+		ppltl = cached.ppltl
+		names = cached.names
+	else:
+		from spgt.translator import Translator
+		t = perf_counter()
+		translator: Translator = Translator(args.domain, args.problem, process_immediate=False, lifted=lifted, streaming=args.stream)
+		phases["translator"] = perf_counter() - t
+		
+		t = perf_counter()
+		translator.ground()
+		phases["ground"] = perf_counter() - t
+		
+		if not args.goal is None:
+			new_start = time()
+			set_goal(args.goal, translator)
+			# subtract the time spent choosing the goal.
+			start_time -= time() - new_start
+		
+		# The translator may already contain, or have been updated
+		# to contain ppltl formulae, in which case we need to use the
+		# correct regressor and planner.
+		ppltl = translator.is_ppltl()
+		
+		t = perf_counter()
+		if args.stream:
+			write_instance(args, translator, instance_loc)
+			instance = None
+		else:
+			instance = emit_instance(args, translator)
+		names = translator.symbols.names if args.integer_ids else None
+		phases["emit"] = perf_counter() - t
+		
+		if cache is not None:
+			text = instance if isinstance(instance, str) else "".join(f"{s}.\n" for s in instance)
+			cache.put(cache_key, CachedTranslation.from_translator(translator, text, names))
 	
-	output = solve(args, instance_loc, start_time)
+	if ppltl:
+		args.ppltl = True
+	
+	# Streamed instances are already saved.
+	if args.save_instance and instance is not None:
+		t = perf_counter()
+		with open(instance_loc, "w+") as f:
+			f.write(instance if isinstance(instance, str) else "".join(f"{s}.\n" for s in instance))
+		phases["save_ASP"] = perf_counter() - t
+	
+	if names is not None:
+		with open(symbols_loc, "w+") as f:
+			json.dump(names, f)
+	
+	steps = [] if args.stats_json is not None else None
+	t = perf_counter()
+	output = solve(args, instance, start_time, steps, names, instance_loc if args.stream else None)
+	phases["solve"] = perf_counter() - t
 	with open(output_loc, "w+") as f:
 		f.writelines(s+'\n' for s in output)
+	if output:
+		with open(controller_loc, "w+") as f:
+			json.dump(parse_controller(output), f)
 	
-	print(f"Finished in {(time()-start_time):.2f} seconds.")
+	total = time()-start_time
+	if args.stats_json is not None:
+		write_stats(args, phases, steps, total, output)
+	
+	print(f"Finished in {total:.2f} seconds.")
+	return output
+
+def main():
+	if len(sys.argv) > 1 and sys.argv[1] == 'benchmark':
+		from spgt.benchmark import get_benchmark_args, run_benchmarks
+		run_benchmarks(get_benchmark_args(sys.argv[2:]))
+		return
+	
+	if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+		from spgt.serve import get_serve_args, serve
+		serve(get_serve_args(sys.argv[2:]))
+		return
+	
+	if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+		from spgt.batch import solve_batch
+		args = get_args(batch=True, argv=sys.argv[2:])
+		args.clingo_args = parse_clingo_args(args.clingo_args)
+		solve_batch(args)
+		return
+	
+	args = get_args()
+	args.clingo_args = parse_clingo_args(args.clingo_args)
+	solve_problem(args)
 	
 if __name__ == '__main__':
 	main()
\ No newline at end of file
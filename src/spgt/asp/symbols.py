@@ -1,3 +1,7 @@
+from functools import lru_cache
+
+from clingo import Symbol, String
+
 ASP_VARIABLE_VALUE_SYMBOL = 'variableValue'
 
 ASP_ACTION_SYMBOL = 'action'
@@ -22,4 +26,11 @@ def make_safe(s: str):
 	# # s = s.replace('(', '_')
 	# # s = s.replace(')', '_')
 	return '\"' + s + '\"'
-	
\ No newline at end of file
+
+@lru_cache(maxsize=2**16)
+def make_safe_symbol(s: str) -> Symbol:
+	'''
+	The clingo term equivalent of `make_safe`.
+	Names are repeated across many facts, so recently used terms are only made once.
+	'''
+	return String(s)
@@ -1,13 +1,81 @@
-from typing import List, Tuple
+from typing import Dict, List, Tuple
+
+from clingo import Symbol, Function
 
 from spgt.base.logic import Formula, Conj, Assign, Neg, Atom, Variable, Value
 from spgt.asp.symbols import *
 
-class GroundedEffect:
+class SymbolTable:
+	'''
+	Interns the names of a grounded task to consecutive integers.
+	'''
+	__slots__ = ("ids", "names")
+	
+	def __init__(self):
+		self.ids: Dict[str, int] = {}
+		self.names: List[str] = []
+	
+	def intern(self, name: str) -> int:
+		'''
+		Returns the integer for name, giving it the next one if it has none.
+		'''
+		i = self.ids.get(name)
+		if i is None:
+			i = len(self.names)
+			self.ids[name] = i
+			self.names.append(name)
+		return i
+	
+	def name(self, i: int) -> str:
+		return self.names[i]
+	
+	def __len__(self):
+		return len(self.names)
+
+class _Immutable:
+	'''
+	Attributes are only set once, by `_init`. Subclasses list them in `__slots__`,
+	so instances have no `__dict__`.
+	'''
+	__slots__ = ()
+	
+	def _init(self, **attributes):
+		for attr, value in attributes.items():
+			object.__setattr__(self, attr, value)
+	
+	def __setattr__(self, attr, value):
+		raise AttributeError(f"{type(self).__name__} is immutable.")
+	
+	def __delattr__(self, attr):
+		raise AttributeError(f"{type(self).__name__} is immutable.")
+
+class GroundedEffect(_Immutable):
+	'''
+	The values an effect adds and deletes. Names are unique within a task, so the hash is
+	that of the name, computed once.
+	'''
+	__slots__ = ("name", "add", "delete", "_hash")
+	
 	def __init__(self, name, add: List[Tuple[Variable, Value]], delete: List[Tuple[Variable, Value]]):
-		self.name = name
-		self.add = add
-		self.delete = delete
+		self._init(
+			name=name,
+			add=tuple(add),
+			delete=tuple(delete),
+			_hash=hash(name)
+		)
+	
+	def __reduce__(self):
+		return (GroundedEffect, (self.name, self.add, self.delete))
+	
+	def __hash__(self):
+		return self._hash
+	
+	def __eq__(self, other):
+		return self is other or (isinstance(other, GroundedEffect)
+			and self._hash == other._hash
+			and self.name == other.name
+			and self.add == other.add
+			and self.delete == other.delete)
 	
 	def as_ASP(self):
 		"""
@@ -30,6 +98,24 @@ class GroundedEffect:
 				alternate_s = ASP_EFFECT_ADD_SYMBOL + f"({make_safe(self.name)}, {make_safe(var.symbol)}, {opposite.as_ASP()})."
 				ls.append(alternate_s)
 		return ls
+	
+	def as_symbols(self) -> List[Symbol]:
+		'''
+		Returns the facts of `as_ASP` as clingo terms.
+		'''
+		name = make_safe_symbol(self.name)
+		ls = []
+		for var,val in self.add:
+			ls.append(Function(ASP_EFFECT_ADD_SYMBOL, [name, make_safe_symbol(var.symbol), val.as_symbol()]))
+			if var.is_binary():
+				opposite = ASP_FALSE_VALUE if val.symbol == ASP_TRUE_VALUE else ASP_TRUE_VALUE
+				ls.append(Function(ASP_EFFECT_DELETE_SYMBOL, [name, make_safe_symbol(var.symbol), make_safe_symbol(opposite)]))
+		for var,val in self.delete:
+			ls.append(Function(ASP_EFFECT_DELETE_SYMBOL, [name, make_safe_symbol(var.symbol), val.as_symbol()]))
+			if var.is_binary():
+				opposite = ASP_FALSE_VALUE if val.symbol == ASP_TRUE_VALUE else ASP_TRUE_VALUE
+				ls.append(Function(ASP_EFFECT_ADD_SYMBOL, [name, make_safe_symbol(var.symbol), make_safe_symbol(opposite)]))
+		return ls
 		
 	@staticmethod
 	def from_formula(name, f: Formula):
@@ -70,15 +156,39 @@ class GroundedEffect:
 	def __str__(self):
 		return self.__repr__()
 	
+class GroundedAction(_Immutable):
+	'''
+	An action with its precondition and effects. Hashed like `GroundedEffect`.
+	'''
+	__slots__ = ("name", "precondition", "effects", "_hash")
+	
+	def __init__(self, name, precondition: Formula, effects: List[GroundedEffect]):
+		self._init(
+			name=name,
+			precondition=precondition,
+			effects=tuple(effects),
+			_hash=hash(name)
+		)
+	
+	def __reduce__(self):
+		return (GroundedAction, (self.name, self.precondition, self.effects))
+	
 	def __hash__(self):
-		return self.__repr__().__hash__()
+		return self._hash
+	
+	def __eq__(self, other):
+		return self is other or (isinstance(other, GroundedAction)
+			and self._hash == other._hash
+			and self.name == other.name
+			and self.precondition is other.precondition
+			and self.effects == other.effects)
+	
+	def with_precondition(self, precondition: Formula):
+		'''
+		Returns this action with a different precondition.
+		'''
+		return GroundedAction(self.name, precondition, self.effects)
 	
-class GroundedAction:
-	def __init__(self, name, precondition: Formula, effects: list[GroundedEffect]):
-		self.name = name
-		self.precondition = precondition
-		self.effects = effects
-
 	def as_ASP(self):
 		'''
 		Returns a list of ASP rules describe the effect.
@@ -91,10 +201,21 @@ class GroundedAction:
 			ls.append(ASP_ACTION_EFFECT_SYMBOL + f'({make_safe(self.name)}, {make_safe(e.name)}).')
 		
 		return ls
-
+	
+	def as_symbols(self) -> List[Symbol]:
+		'''
+		Returns the facts of `as_ASP` as clingo terms.
+		'''
+		name = make_safe_symbol(self.name)
+		ls = []
+		ls.append(Function(ASP_ACTION_SYMBOL, [name]))
+		ls.append(Function(ASP_ACTION_PRECONDITION_SYMBOL, [name, self.precondition.as_symbol()]))
+		
+		for e in self.effects:
+			ls.append(Function(ASP_ACTION_EFFECT_SYMBOL, [name, make_safe_symbol(e.name)]))
+		
+		return ls
+	
 	def __repr__(self):
 		effect_reps = [e.__repr__() for e in self.effects]
 		return f"Action({self.name}, {self.precondition}, Effects=(" + ",".join(effect_reps) + "))."
-
-	def __hash__(self):
-		return self.__repr__().__hash__()
\ No newline at end of file
@@ -1,11 +1,71 @@
 from __future__ import annotations
-from abc import ABC, abstractmethod
+from abc import ABC, ABCMeta, abstractmethod
 
-from typing import List, Dict
+from typing import List, Dict, Tuple
+import weakref
+
+from clingo import Symbol, Function
 
 from spgt.asp.symbols import *
 
-class Formula(ABC):
+# Every live formula, keyed on its type and constructor arguments.
+_nodes = weakref.WeakValueDictionary()
+
+class _Interned(ABCMeta):
+	'''
+	Makes structurally equal formulae the same object, so identical subformulae
+	are only stored, hashed and serialised once. Formulae must therefore never be mutated.
+	'''
+	def __call__(cls, *args, **kwargs):
+		if kwargs:
+			# Keyword arguments are made positional, so formulae are interned however they are built.
+			args = _positional_args(cls, args, kwargs)
+		key = (cls, cls._key(*args))
+		node = _nodes.get(key)
+		if node is None:
+			node = super().__call__(*args)
+			node._args = args
+			node._memo = {}
+			_nodes[key] = node
+		return node
+
+def _positional_args(cls, args: Tuple, kwargs: Dict) -> Tuple:
+	'''
+	The arguments to construct cls with, given positionally.
+	'''
+	# Only imported when formulae are built with keywords, which they rarely are.
+	import inspect
+	bound = inspect.signature(cls.__init__).bind(None, *args, **kwargs)
+	return bound.args[1:]
+
+def _transform(root: Formula, name: str, children, combine):
+	'''
+	Transforms root bottom up with an explicit stack rather than recursion, so deep
+	formulae are not bound by the recursion limit. `children(F, name)` gives the
+	(formula, name) pairs the result for F is built from, and `combine(F, name, results)`
+	builds it. Results are cached on each formula under their name, so shared
+	subformulae are only transformed once.
+	'''
+	if name in root._memo:
+		return root._memo[name]
+	
+	stack = [(root, name, None)]
+	while stack:
+		F, key, deps = stack.pop()
+		if key in F._memo:
+			continue
+		if deps is None:
+			deps = children(F, key)
+			stack.append((F, key, deps))
+			stack.extend((C, k, None) for C, k in deps if k not in C._memo)
+			continue
+		F._memo[key] = combine(F, key, [C._memo[k] for C, k in deps])
+	return root._memo[name]
+
+def _subformulae(F: Formula, name: str):
+	return [(C, name) for C in F._children()]
+
+class Formula(ABC, metaclass=_Interned):
 	symbol: str
 	ASP_SYMBOL: str
 	binary_mappings = {
@@ -19,9 +79,52 @@ class Formula(ABC):
 		'!': 'Neg',
 		'Y': 'Yesterday'
 	}
+	binary_precedence = {
+		'=': 5,
+		'S': 3,
+		'Z': 3,
+		'&': 2,
+		'|': 1
+	}
+	unary_precedence = 4
+	
+	@classmethod
+	def _key(cls, *args):
+		'''
+		What identifies a formula of this type built from args.
+		'''
+		return args
+	
+	def __reduce__(self):
+		# Unpickled formulae are interned too.
+		return (type(self), self._args)
+	
+	def _children(self) -> Tuple[Formula]:
+		'''
+		The subformulae this formula is built from.
+		'''
+		return ()
+	
+	def _ASP(self, children: List[str]) -> str:
+		'''
+		The ASP of this formula, given the ASP of its children.
+		'''
+		return self.ASP_SYMBOL
+	
+	def _symbol(self, children: List[Symbol]) -> Symbol:
+		'''
+		The clingo term of this formula, given the terms of its children.
+		'''
+		return Function(self.ASP_SYMBOL)
 	
 	def as_ASP(self):
-		return self.ASP_SYMBOL
+		return _transform(self, "as_ASP", _subformulae, lambda F, _, children: F._ASP(children))
+	
+	def as_symbol(self) -> Symbol:
+		'''
+		Returns the clingo term equivalent to `as_ASP`, without going through a string.
+		'''
+		return _transform(self, "as_symbol", _subformulae, lambda F, _, children: F._symbol(children))
 	
 	def __repr__(self):
 		return type(self).__name__
@@ -30,147 +133,178 @@ class Formula(ABC):
 		return self.symbol
 	
 	def is_ppltl(self):
-		return False
+		return _transform(self, "is_ppltl", _subformulae,
+			lambda F, _, children: isinstance(F, (Yesterday, Since, DualSince)) or any(children))
 	
 	@staticmethod
-	def __check_binary(s: str, binary_symbols = None) -> int | None:
-		if binary_symbols is None:
-			binary_symbols = Formula.binary_mappings.keys()
-		
-		i = 0
-		level = 0
-		while i < len(s):
-			if level == 0 and s[i] in binary_symbols:
-				return i
-			if s[i] == "(":
-				level += 1
-			if s[i] == ")":
-				level -= 1
-			i += 1
-		
-		return None
+	def __parse_error(s: str, position: int, message: str) -> ValueError:
+		return ValueError(f"{message} at position {position}:\n\t{s}\n\t{' ' * position}^")
 	
 	@staticmethod
-	def __matching_bracket(s: str, index: int=0) -> int | None:
-		i = index + 1
-		level = 0
-		assert s[index] == '('
-		while (i < len(s)):
-			if level == 0 and s[i] == ")":
-				return i
-			if s[i] == "(":
-				level += 1
-			if s[i] == ")":
-				level -= 1
-			i += 1
-		return None
+	def __tokenize(s: str):
+		"""
+		Yields the (kind, text, position) tokens of s in a single pass, where kind is
+		'binary', 'unary', '(', ')' or 'atom'. An atom name directly followed by brackets,
+		such as `up()` or `at(p1)`, keeps them as part of its name.
+		"""
+		binary_symbols = Formula.binary_mappings.keys()
+		# Characters which end an atom name.
+		stops = set(binary_symbols) | {'(', ')', '!'}
+		operand_expected = True
+		i = 0
+		while i < len(s):
+			c = s[i]
+			if c.isspace():
+				i += 1
+				continue
+			if c in '()':
+				yield (c, c, i)
+				operand_expected = c == '('
+				i += 1
+				continue
+			if c in binary_symbols:
+				yield ('binary', c, i)
+				operand_expected = True
+				i += 1
+				continue
+			# `Y` is only yesterday where a formula starts, elsewhere it may be part of a name.
+			if c in Formula.unary_mappings and (c == '!' or operand_expected):
+				yield ('unary', c, i)
+				operand_expected = True
+				i += 1
+				continue
+			
+			start = i
+			while i < len(s) and not s[i].isspace() and s[i] not in stops:
+				i += 1
+				if i < len(s) and s[i] == '(':
+					# The arguments of the atom, up to the matching bracket.
+					level = 0
+					for j in range(i, len(s)):
+						level += {'(': 1, ')': -1}.get(s[j], 0)
+						if level == 0:
+							break
+					if level != 0:
+						raise Formula.__parse_error(s, i, "Unmatched '('")
+					i = j + 1
+			yield ('atom', s[start:i], start)
+			operand_expected = False
 	
 	@staticmethod
 	def parse(s: str) -> Formula:
 		"""
 		Returns the Formula object equivalent of the str.
 		Any symbols not identified as formulae are used to name atoms.
-		This includes unmatched brackets.
+		From tightest to loosest binding the operators are `=`, then `!` and `Y`,
+		then `S` and `Z`, then `&` and lastly `|`. Binary operators group to the right.
+		Raises a ValueError giving the position of any syntax error.
 		"""
-		mappings = Formula.binary_mappings | Formula.unary_mappings
+		precedence = Formula.binary_precedence
+		unary_precedence = Formula.unary_precedence
 		
-		s = s.strip()
-		if s[0] == "(":
-			brack_index = Formula.__matching_bracket(s)
-			if brack_index == len(s)-1:
-				return Formula.parse(s[1:-1])
+		# An iterative precedence climb, so deep formulae are not bound by the recursion limit.
+		operands: List[Formula] = []
+		# (kind, symbol, position) of operators and open brackets not yet applied.
+		operators: List[Tuple[str, str, int]] = []
 		
-		binary_index = Formula.__check_binary(s)
-		if binary_index is not None:
-			# There was a binary symbol
-			left = Formula.parse(s[0:binary_index])
-			symbol = s[binary_index]
-			right = Formula.parse(s[binary_index+1:])
-			return globals()[mappings[symbol]](left, right)
+		def reduce():
+			kind, symbol, _ = operators.pop()
+			if kind == 'unary':
+				arg = operands.pop()
+				operands.append(globals()[Formula.unary_mappings[symbol]](arg))
+				return
+			right = operands.pop()
+			left = operands.pop()
+			operands.append(globals()[Formula.binary_mappings[symbol]](left, right))
 		
-		# If we begin with a valid symbol, parse as unary.
-		if s[0] in mappings:
-			return globals()[mappings[s[0]]](Formula.parse(s[1:]))
+		def binds(kind, symbol):
+			return precedence[symbol] if kind == 'binary' else unary_precedence
 		
-		return Atom(s)
+		operand_expected = True
+		for kind, text, position in Formula.__tokenize(s):
+			if operand_expected:
+				if kind == 'atom':
+					operands.append(Atom(text))
+					operand_expected = False
+				elif kind in ['(', 'unary']:
+					operators.append((kind, text, position))
+				else:
+					raise Formula.__parse_error(s, position, f"Expected a formula but found '{text}'")
+				continue
+			
+			if kind == 'binary':
+				# Every operator is right associative, so only tighter ones are applied first.
+				while operators and operators[-1][0] != '(' and binds(*operators[-1][:2]) > precedence[text]:
+					reduce()
+				operators.append((kind, text, position))
+				operand_expected = True
+			elif kind == ')':
+				while operators and operators[-1][0] != '(':
+					reduce()
+				if not operators:
+					raise Formula.__parse_error(s, position, "Unmatched ')'")
+				operators.pop()
+			else:
+				raise Formula.__parse_error(s, position, f"Expected an operator but found '{text}'")
+		
+		if operand_expected:
+			raise Formula.__parse_error(s, len(s), "Expected a formula")
+		while operators:
+			if operators[-1][0] == '(':
+				raise Formula.__parse_error(s, operators[-1][2], "Unmatched '('")
+			reduce()
+		return operands.pop()
 	
 	@staticmethod
-	def __inverse_demorgan(F: Formula):
-		"""
-		Returns the negation of F, attempting to avoid having
-		a Neg() formula as the parent.
-		This means de Morgan laws are applied for conjunctions
-		and disjunctions, Falsum and Verum return eachother
-		and top-level negations are removed.
-		Atoms return Neg(A).
-		"""
-		negations = lambda F: [Neg(s) for s in F._sub]
-		
-		switch = {
-			Falsum: lambda F: Verum(),
-			Verum: lambda F: Falsum(),
-			Atom: lambda F: Neg(F),
-			Neg: lambda F: F._arg,
-			Assign: lambda F: Neg(F),
-			Conj: lambda F: Disj(*negations(F)),
-			Disj: lambda F: Conj(*negations(F)),
-			Yesterday: lambda F: Yesterday(Neg(F._arg)),
-			Since: lambda F: DualSince(*negations(F)),
-			DualSince: lambda F: Since(*negations(F))
-		}
-		
-		if not isinstance(F, tuple(switch.keys())):
-			raise ValueError(f"Type '{type(F)}' not supported.")
-		
-		return switch[type(F)](F)
+	def __nnf_children(F: Formula, name: str):
+		if isinstance(F, Neg):
+			# Negations are pushed down by transforming the argument with the opposite polarity.
+			return [(F._arg, _NNF if name == _NEGATED_NNF else _NEGATED_NNF)]
+		if isinstance(F, (Atom, Assign)) or type(F) in _DUALS:
+			return _subformulae(F, name)
+		raise ValueError(f"Type '{type(F)}' not supported.")
+	
+	@staticmethod
+	def __nnf_combine(F: Formula, name: str, children: List[Formula]):
+		negated = name == _NEGATED_NNF
+		if isinstance(F, Neg):
+			return children[0]
+		if isinstance(F, (Atom, Assign)):
+			return Neg(F) if negated else F
+		# De Morgan's laws, and their temporal equivalents.
+		op = _DUALS[type(F)] if negated else type(F)
+		return op(*children)
 	
 	@staticmethod
 	def NNF(F: Formula):
 		"""
 		Returns a new formula equivalent to F in Negation Normal Form.
 		"""
-		do_nothing = lambda F: F
-		recurse = lambda F: [Formula.NNF(s) for s in F._sub]
-		
-		def negation_case(F: Neg):
-			if  isinstance(F._arg, (Atom, Assign)):
-				return F
-			return Formula.NNF(Formula.__inverse_demorgan(F._arg))
-		
-		switch = {
-			Falsum: do_nothing,
-			Verum: do_nothing,
-			Atom: do_nothing,
-			Assign: do_nothing,
-			Neg: negation_case,
-			Conj: lambda F: Conj(*recurse(F)),
-			Disj: lambda F: Disj(*recurse(F)),
-			Yesterday: lambda F: Yesterday(Formula.NNF(F._arg)),
-			Since: lambda F: Since(*recurse(F)),
-			DualSince: lambda F: DualSince(*recurse(F)),
-		}
-		
-		if not isinstance(F, tuple(switch.keys())):
+		return _transform(F, _NNF, Formula.__nnf_children, Formula.__nnf_combine)
+	
+	@staticmethod
+	def __simplify_children(F: Formula, name: str):
+		if not isinstance(F, (Falsum, Verum, Atom, Neg, Assign, Variable, BinaryOp, Yesterday)):
 			raise ValueError(f"Type '{type(F)}' not supported.")
-		
-		return switch[type(F)](F)
+		if isinstance(F, Assign):
+			return []
+		return _subformulae(F, name)
 	
 	@staticmethod
-	def simplify_constants(F: Formula):
-		"""
-		Returns a new formula with the constants dissolved away.
-		"""
-		do_nothing = lambda F: F
-		recurse = lambda F: [Formula.simplify_constants(s) for s in F._sub]
+	def __simplify_combine(F: Formula, name: str, children: List[Formula]):
+		if not children:
+			return F
 		
-		def negation_case(F: Neg):
-			if isinstance(F._arg, Falsum):
+		if isinstance(F, Neg):
+			if isinstance(children[0], Falsum):
 				return Verum()
-			if isinstance(F._arg, Verum):
+			if isinstance(children[0], Verum):
 				return Falsum()
-			return F
+			return Neg(children[0])
 		
-		def dissolve_or_disprove(F : Conj | Disj, dissolve, disprove):
+		F = type(F)(*children)
+		if isinstance(F, (Conj, Disj)):
+			dissolve, disprove = (Verum, Falsum) if isinstance(F, Conj) else (Falsum, Verum)
 			if disprove in [type(x) for x in F._sub]:
 				return disprove()
 			if dissolve in [type(x) for x in F._sub]:
@@ -178,27 +312,14 @@ class Formula(ABC):
 				if not new_subs:
 					return dissolve()
 				return new_subs.pop()
-			return F
-		
-		switch = {
-			Falsum: do_nothing,
-			Verum: do_nothing,
-			Atom: do_nothing,
-			Neg: negation_case,
-			Assign: do_nothing,
-			Value: do_nothing,
-			Variable: do_nothing,
-			Conj: lambda F: dissolve_or_disprove(type(F)(*recurse(F)), Verum, Falsum),
-			Disj: lambda F: dissolve_or_disprove(type(F)(*recurse(F)), Falsum, Verum),
-			Yesterday: lambda F: type(F)(Formula.simplify_constants(F._arg)),
-			Since: lambda F: type(F)(*recurse(F)),
-			DualSince: lambda F: type(F)(*recurse(F)),
-		}
-		
-		if not isinstance(F, tuple(switch.keys())):
-			raise ValueError(f"Type '{type(F)}' not supported.")
-		
-		return switch[type(F)](F)
+		return F
+	
+	@staticmethod
+	def simplify_constants(F: Formula):
+		"""
+		Returns a new formula with the constants dissolved away.
+		"""
+		return _transform(F, "simplify_constants", Formula.__simplify_children, Formula.__simplify_combine)
 	
 class UnaryOp(Formula):
 	_arg: Formula
@@ -212,20 +333,26 @@ class UnaryOp(Formula):
 	def __str__(self):
 		return f"{self.symbol}{self._arg}"
 	
-	def as_ASP(self):
+	def _children(self) -> Tuple[Formula]:
+		return (self._arg,)
+	
+	def _ASP(self, children: List[str]) -> str:
 		if isinstance(self._arg, Atom):
 			return ASP_HAS_VALUE_SYMBOL + f"({make_safe(self._arg.symbol)}, {ASP_FALSE_VALUE})"
 		
-		return f"{self.ASP_SYMBOL}({self._arg.as_ASP()})"
+		return f"{self.ASP_SYMBOL}({children[0]})"
 	
-	def is_ppltl(self):
-		return self._arg.is_ppltl()
+	def _symbol(self, children: List[Symbol]) -> Symbol:
+		if isinstance(self._arg, Atom):
+			return Function(ASP_HAS_VALUE_SYMBOL, [make_safe_symbol(self._arg.symbol), Function(ASP_FALSE_VALUE)])
+		
+		return Function(self.ASP_SYMBOL, children)
 
 class BinaryOp(Formula):
-	_sub: List[Formula]
+	_sub: Tuple[Formula]
 	
 	def __init__(self, *args):
-		self._sub = list(args)
+		self._sub = tuple(args)
 	
 	def __repr__(self):
 		children_rep = ", ".join([x.__repr__() for x in self._sub])
@@ -235,27 +362,23 @@ class BinaryOp(Formula):
 		children_strs = self.symbol.join([str(x) for x in self._sub])
 		return f"({children_strs})"
 	
-	def as_ASP(self):
-		child_symbols = [x.as_ASP() for x in self._sub]
-		children_str = ','.join(child_symbols)
+	def _children(self) -> Tuple[Formula]:
+		return self._sub
+	
+	def _ASP(self, children: List[str]) -> str:
+		children_str = ','.join(children)
 		return f"{self.ASP_SYMBOL}({children_str})"
 	
-	def is_ppltl(self):
-		return sum(x.is_ppltl() for x in self._sub) >= 1
+	def _symbol(self, children: List[Symbol]) -> Symbol:
+		return Function(self.ASP_SYMBOL, children)
 
 class Since(BinaryOp):
 	symbol = "S"
 	ASP_SYMBOL = "since"
-	
-	def is_ppltl(self):
-		return True
 
 class DualSince(BinaryOp):
 	symbol = "DS"
 	ASP_SYMBOL = 'dual_since'
-	
-	def is_ppltl(self):
-		return True
 
 class Conj(BinaryOp):
 	symbol = "\u2227"
@@ -269,17 +392,21 @@ class Assign(BinaryOp):
 	symbol = "="
 	ASP_SYMBOL = "has_value"
 	
-	def as_ASP(self):
+	def _children(self) -> Tuple[Formula]:
+		# The variable and value are named directly, rather than as formulae.
+		return ()
+	
+	def _ASP(self, children: List[str]) -> str:
 		child_symbols = [make_safe(x.symbol) for x in self._sub]
 		children_str = ','.join(child_symbols)
 		return f"{self.ASP_SYMBOL}({children_str})"
+	
+	def _symbol(self, children: List[Symbol]) -> Symbol:
+		return Function(self.ASP_SYMBOL, [make_safe_symbol(x.symbol) for x in self._sub])
 
 class Yesterday(UnaryOp):
 	symbol = "Y"
 	ASP_SYMBOL = "yest"
-	
-	def is_ppltl(self):
-		return True
 
 class Neg(UnaryOp):
 	symbol = "\u00AC"
@@ -291,23 +418,28 @@ class Atom(Formula):
 	symbol: str
 	
 	def __init__(self, name:str = "NO SYMBOL"):
-		self.symbol = name
+		# PDDL names compare case-insensitively, so keep plain strings.
+		self.symbol = str(name)
 	
-	def as_ASP(self):
+	@classmethod
+	def _key(cls, name: str = "NO SYMBOL"):
+		return str(name)
+	
+	def _ASP(self, children: List[str]) -> str:
 		return make_safe(self.symbol)
+	
+	def _symbol(self, children: List[Symbol]) -> Symbol:
+		return make_safe_symbol(self.symbol)
 
 class Variable(Formula):
 	def __init__(self, name: str, domain: List[str]):
-		self.symbol = name
-		self.domain = domain
+		self.symbol = str(name)
+		self.domain = tuple(str(v) for v in domain)
 	
-	def __eq__(self, other):
-		return isinstance(other, Variable) \
-			and other.symbol == self.symbol \
-			and other.domain == self.domain
-	
-	def __hash__(self):
-		return hash((self.symbol, *sorted(self.domain)))
+	@classmethod
+	def _key(cls, name: str, domain: List[str]):
+		# Interned like other formulae, so variables are equal only if they are the same object.
+		return (str(name), tuple(str(v) for v in domain))
 	
 	def as_ASP(self):
 		ls = []
@@ -315,13 +447,20 @@ class Variable(Formula):
 			ls.append(ASP_VARIABLE_VALUE_SYMBOL + f"({make_safe(self.symbol)}, {make_safe(val)}).")
 		return ls
 	
+	def as_symbols(self) -> List[Symbol]:
+		'''
+		Returns the facts of `as_ASP` as clingo terms.
+		'''
+		return [Function(ASP_VARIABLE_VALUE_SYMBOL, [make_safe_symbol(self.symbol), make_safe_symbol(val)]) for val in self.domain]
+	
 	def from_atom(atom: Atom):
 		symbol = atom.symbol
 		domain = [ASP_TRUE_VALUE, ASP_FALSE_VALUE]
 		return Variable(symbol, domain)
 	
 	def is_binary(self) -> bool:
-		return set(self.domain) == {ASP_TRUE_VALUE, ASP_FALSE_VALUE}
+		# Checking the length first avoids hashing every value of large domains.
+		return len(self.domain) == 2 and set(self.domain) == {ASP_TRUE_VALUE, ASP_FALSE_VALUE}
 
 
 class Value(Atom):
@@ -333,4 +472,19 @@ class Verum(Formula):
 
 class Falsum(Formula):
 	symbol = '\u22A5'
-	ASP_SYMBOL = "falsum"
\ No newline at end of file
+	ASP_SYMBOL = "falsum"
+
+# The names NNF results are cached under, for a formula and for its negation.
+_NNF = "NNF"
+_NEGATED_NNF = "negated NNF"
+
+# What each operator becomes when negated.
+_DUALS = {
+	Verum: Falsum,
+	Falsum: Verum,
+	Conj: Disj,
+	Disj: Conj,
+	Yesterday: Yesterday,
+	Since: DualSince,
+	DualSince: Since,
+}
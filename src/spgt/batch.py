@@ -0,0 +1,52 @@
+import copy
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from spgt.translator import Translator, LiftedDomain
+from spgt.__main__ import solve_problem
+
+# Set in each worker process by `_init_worker`, so the domain is only sent once per worker.
+_worker_args = None
+_worker_lifted: LiftedDomain | None = None
+
+def _init_worker(args, lifted: LiftedDomain):
+	global _worker_args, _worker_lifted
+	_worker_args = args
+	_worker_lifted = lifted
+
+def problem_args(args, problem: str):
+	'''
+	Returns a copy of the batch arguments for solving a single problem,
+	with its output in a subdirectory of the temporary directory named after the problem.
+	Its `--stats_json` report has the problem's name added to the file name, e.g. stats_p01.json.
+	'''
+	name = os.path.splitext(os.path.basename(problem))[0]
+	local_args = copy.copy(args)
+	local_args.problem = problem
+	local_args.temp_dir = os.path.join(args.temp_dir, name)
+	if args.stats_json is not None:
+		stem, ext = os.path.splitext(args.stats_json)
+		local_args.stats_json = f"{stem}_{name}{ext or '.json'}"
+	return local_args
+
+def _solve_in_worker(problem: str) -> List[str]:
+	return solve_problem(problem_args(_worker_args, problem), _worker_lifted)
+
+def solve_batch(args, lifted: LiftedDomain | None = None) -> Dict[str, List[str]]:
+	'''
+	Solves every problem in `args.problems` for the domain `args.domain`.
+	The domain is parsed, normalised and analysed once, then shared by every problem,
+	which are translated and solved in a pool of `args.workers` processes.
+	returns a dictionary from each problem to the output of its solver.
+	'''
+	if lifted is None:
+		lifted = Translator.lift_domain(args.domain)
+	
+	if args.workers <= 1:
+		return dict((p, solve_problem(problem_args(args, p), lifted)) for p in args.problems)
+	
+	with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args, lifted)) as pool:
+		outputs = pool.map(_solve_in_worker, args.problems)
+		return dict(zip(args.problems, outputs))
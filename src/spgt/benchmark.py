@@ -0,0 +1,260 @@
+import argparse
+import contextlib
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import resource
+import shlex
+import subprocess
+import tempfile
+
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+import pddl
+from fondutils.normalizer import normalize
+
+from spgt.translator import Translator
+from spgt.solver import solve
+from spgt.cache import spgt_version
+from spgt.__main__ import get_args, set_goal, parse_clingo_args, emit_instance, write_instance
+
+# The Python side phases timed for every instance, in the order they happen.
+PHASES = ["parse", "normalise", "ground", "emit"]
+
+# How often to check whether the process running an instance has died, in seconds.
+POLL_INTERVAL = 0.5
+
+CSV_FIELDS = ["domain", "problem", "config", "status", "nodes", "actions", "total",
+			  "peak_rss_kb", "children_peak_rss_kb"] + PHASES + ["k", "clingo_ground", "clingo_solve", "result"]
+
+def find_instances(root: str, domains: List[str] = [], problems: List[str] = []) -> List[Tuple[str, str]]:
+	'''
+	Returns every (domain file, problem file) pair below root.
+	Each domain is a directory containing `domain.pddl`, and every other `.pddl`
+	file in it is a problem. `domains` and `problems` optionally restrict them by name.
+	'''
+	pairs = []
+	for domain_path in sorted(glob.glob(os.path.join(root, "*", "domain.pddl"))):
+		domain_dir = os.path.dirname(domain_path)
+		if domains and os.path.basename(domain_dir) not in domains:
+			continue
+		for problem_path in sorted(glob.glob(os.path.join(domain_dir, "*.pddl"))):
+			if problem_path == domain_path:
+				continue
+			if problems and os.path.splitext(os.path.basename(problem_path))[0] not in problems:
+				continue
+			pairs.append((os.path.abspath(domain_path), os.path.abspath(problem_path)))
+	return pairs
+
+def run_instance(argv: List[str], translate_only: bool = False) -> Dict:
+	'''
+	Translates and solves a single instance with the given spgt command line,
+	timing each phase. Meant to be run in its own process, so the peak memory is its own.
+	If translate_only is set the instance is not solved.
+	'''
+	args = get_args(argv=argv)
+	args.clingo_args = parse_clingo_args(args.clingo_args)
+	phases = {}
+	
+	start = perf_counter()
+	domain = pddl.parse_domain(args.domain)
+	t = perf_counter()
+	phases["parse"] = t - start
+	
+	lifted = Translator.lift_domain(args.domain, normalize(domain))
+	phases["normalise"] = perf_counter() - t
+	
+	t = perf_counter()
+	translator = Translator(args.domain, args.problem, process_immediate=False, lifted=lifted, streaming=args.stream)
+	phases["parse"] += perf_counter() - t
+	
+	t = perf_counter()
+	translator.ground()
+	if args.goal is not None:
+		set_goal(args.goal, translator)
+	phases["ground"] = perf_counter() - t
+	
+	t = perf_counter()
+	instance_file = None
+	if args.stream:
+		instance_file = os.path.join(args.temp_dir, "instance.lp")
+		write_instance(args, translator, instance_file)
+		instance = None
+	else:
+		instance = emit_instance(args, translator)
+	names = translator.symbols.names if args.integer_ids else None
+	phases["emit"] = perf_counter() - t
+	
+	if translator.is_ppltl():
+		args.ppltl = True
+	
+	if translate_only:
+		return {
+			"status": "translated",
+			"nodes": None,
+			"total": perf_counter() - start,
+			"peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+			"children_peak_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+			"phases": phases,
+			"steps": [],
+			# Streamed actions are not kept, so are not counted.
+			"actions": None if args.stream else len(translator.grounded_actions),
+		}
+	
+	steps = []
+	with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+		output = solve(args, instance, start, steps, names, instance_file)
+	
+	# Sizes killed by --jobs once a smaller one was solved have no step.
+	solved_sizes = [step["nodes"] for step in steps if step["result"] == "SAT"]
+	nodes = min(solved_sizes) if solved_sizes else None
+	return {
+		"status": "solved" if output else "failed",
+		"nodes": nodes,
+		"total": perf_counter() - start,
+		"peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+		# clingo subprocesses, which have all finished by now.
+		"children_peak_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+		"phases": phases,
+		"steps": steps,
+	}
+
+def _run_instance_in_child(argv: List[str], translate_only: bool, queue):
+	try:
+		queue.put(run_instance(argv, translate_only))
+	except Exception as e:
+		queue.put({"status": "error", "error": repr(e)})
+
+def run_isolated(argv: List[str], timeout: float | None = None, translate_only: bool = False) -> Dict:
+	'''
+	Runs `run_instance` in a fresh process, giving up after timeout seconds,
+	or as soon as the process exits without a result.
+	'''
+	ctx = multiprocessing.get_context("spawn")
+	queue = ctx.Queue()
+	proc = ctx.Process(target=_run_instance_in_child, args=(argv, translate_only, queue))
+	proc.start()
+	
+	deadline = None if timeout is None else perf_counter() + timeout
+	result = None
+	while result is None:
+		# Checked before waiting, so a result put just before exiting is still read.
+		alive = proc.is_alive()
+		try:
+			result = queue.get(timeout=POLL_INTERVAL)
+		except queue_module.Empty:
+			if not alive:
+				# e.g. a crash in clingo, running out of memory, or exiting without raising an Exception.
+				result = {"status": "error", "error": f"exited with code {proc.exitcode} without a result"}
+			elif deadline is not None and perf_counter() >= deadline:
+				result = {"status": "timeout"}
+	proc.kill()
+	proc.join()
+	return result
+
+def git_commit() -> str:
+	'''
+	The commit spgt is running from, if it is in a git repository.
+	'''
+	try:
+		proc = subprocess.run(
+			["git", "rev-parse", "--short", "HEAD"],
+			cwd=os.path.dirname(os.path.abspath(__file__)),
+			stdout=subprocess.PIPE,
+			stderr=subprocess.DEVNULL,
+			text=True
+		)
+	except OSError:
+		return ""
+	return proc.stdout.strip()
+
+def csv_rows(record: Dict) -> List[Dict]:
+	'''
+	Flattens one instance's record into one CSV row per size tried.
+	'''
+	base = dict((f, record.get(f)) for f in ["domain", "problem", "config", "status", "nodes", "actions", "total", "peak_rss_kb", "children_peak_rss_kb"])
+	base |= record.get("phases", {})
+	steps = record.get("steps") or [{}]
+	rows = []
+	for step in steps:
+		row = dict(base)
+		row["k"] = step.get("nodes")
+		row["clingo_ground"] = step.get("ground")
+		row["clingo_solve"] = step.get("solve")
+		row["result"] = step.get("result")
+		rows.append(row)
+	return rows
+
+def get_benchmark_args(argv: List[str] | None = None):
+	parser = argparse.ArgumentParser(
+		"spgt benchmark",
+		description="Times spgt on every instance of a directory of benchmark domains."
+	)
+	parser.add_argument("root",
+					 nargs='?',
+					 default=os.path.join("benchmarks", "domains"),
+					 help="A directory with one subdirectory per domain.")
+	parser.add_argument('--domains', nargs='+', default=[],
+					 help="Only run these domains.")
+	parser.add_argument('--problems', nargs='+', default=[],
+					 help="Only run problems with these names, e.g. p01.")
+	parser.add_argument('--config',
+					 action='append',
+					 help="""spgt flags to run every instance with, e.g. --config="--ppltl --strong".
+					 May be given several times to compare configurations.""")
+	parser.add_argument('--timeout', type=float, default=None,
+					 help="Seconds to allow each instance.")
+	parser.add_argument('--translate_only', action='store_true',
+					 help="Only parse and ground each instance, without solving it.")
+	parser.add_argument('--csv', type=str, help="Where to write one row per controller size tried.")
+	parser.add_argument('--json', type=str, help="Where to write the full results.")
+	args = parser.parse_args(argv)
+	if args.config is None:
+		args.config = [""]
+	return args
+
+def run_benchmarks(args) -> Dict:
+	'''
+	Runs every configuration on every instance, returning the results.
+	'''
+	results = {
+		"version": spgt_version(),
+		"commit": git_commit(),
+		"instances": [],
+	}
+	
+	with tempfile.TemporaryDirectory() as temp_dir:
+		for domain_path, problem_path in find_instances(args.root, args.domains, args.problems):
+			for config in args.config:
+				argv = [domain_path, problem_path, "-td", temp_dir] + shlex.split(config)
+				record = {
+					"domain": os.path.basename(os.path.dirname(domain_path)),
+					"problem": os.path.splitext(os.path.basename(problem_path))[0],
+					"config": config,
+				}
+				record |= run_isolated(argv, args.timeout, args.translate_only)
+				results["instances"].append(record)
+				
+				total = record.get("total")
+				total_str = f"{total:.2f}s" if total is not None else "-"
+				size_str = f"{record.get('actions')} actions" if args.translate_only else f"{record.get('nodes')} nodes"
+				print(f"{record['domain']}/{record['problem']} [{config}]: {record['status']}, "
+					  f"{size_str}, {total_str}, {record.get('peak_rss_kb')} KB peak "
+					  f"({record.get('children_peak_rss_kb')} KB in subprocesses).")
+	
+	if args.csv is not None:
+		with open(args.csv, "w", newline="") as f:
+			writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+			writer.writeheader()
+			for record in results["instances"]:
+				writer.writerows(csv_rows(record))
+	
+	if args.json is not None:
+		with open(args.json, "w") as f:
+			json.dump(results, f, indent=1)
+	
+	return results
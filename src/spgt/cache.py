@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+
+from functools import lru_cache
+from typing import List, AnyStr, TYPE_CHECKING
+
+if TYPE_CHECKING:
+	from spgt.translator import Translator
+
+def spgt_version() -> str:
+	# importlib.metadata is slow to import, and only needed for the cache and benchmarks.
+	from importlib.metadata import version, PackageNotFoundError
+	try:
+		return version("spgt")
+	except PackageNotFoundError:
+		return "unknown"
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _package_sources() -> List[str]:
+	'''
+	Every Python module of spgt, relative to the package, in a fixed order.
+	'''
+	sources = []
+	for root, dirs, files in os.walk(PACKAGE_DIR):
+		dirs[:] = [d for d in dirs if d != "__pycache__"]
+		sources += [os.path.relpath(os.path.join(root, f), PACKAGE_DIR) for f in files if f.endswith(".py")]
+	return sorted(sources)
+
+@lru_cache(maxsize=1)
+def translator_digest() -> bytes:
+	'''
+	A hash of spgt's source, so entries from any other version of the translator,
+	or of the names it emits, are never used, even when the version number is unchanged.
+	'''
+	h = hashlib.sha256()
+	for name in _package_sources():
+		h.update(name.encode())
+		with open(os.path.join(PACKAGE_DIR, name), "rb") as f:
+			h.update(hashlib.sha256(f.read()).digest())
+	return h.digest()
+
+class CachedTranslation:
+	'''
+	The parts of a Translator needed to solve an instance without re-translating it.
+	'''
+	def __init__(self, instance: AnyStr, ppltl: bool, names: List[str] | None = None):
+		self.instance = instance
+		self.ppltl = ppltl
+		# The name of each integer in instances translated with integer ids.
+		self.names = names
+	
+	@staticmethod
+	def from_translator(t: Translator, instance: AnyStr | None = None, names: List[str] | None = None):
+		'''
+		Captures the output of t, using `instance` as its ASP if it was already produced.
+		'''
+		if instance is None:
+			instance = "".join(t.as_ASP())
+		return CachedTranslation(instance, t.is_ppltl(), names)
+	
+	def to_json(self) -> str:
+		d = {
+			"instance": self.instance,
+			"ppltl": self.ppltl
+		}
+		if self.names is not None:
+			d["names"] = self.names
+		return json.dumps(d)
+	
+	@staticmethod
+	def from_json(s: str):
+		d = json.loads(s)
+		return CachedTranslation(d["instance"], d["ppltl"], d.get("names"))
+
+class TranslationCache:
+	'''
+	An on-disk cache of translated instances, keyed on the contents of the
+	domain and problem files, the goal override, the spgt version and the translator's source.
+	Entries are evicted least recently used first once the cache exceeds `max_bytes`.
+	'''
+	def __init__(self, cache_dir: str, max_bytes: int = 2**30):
+		self.cache_dir = os.path.abspath(cache_dir)
+		self.max_bytes = max_bytes
+		os.makedirs(self.cache_dir, exist_ok=True)
+	
+	@staticmethod
+	def key(domain_path: str, instance_path: str, goal: str | None = None, integer_ids: bool = False) -> str:
+		h = hashlib.sha256()
+		for path in [domain_path, instance_path]:
+			with open(path, "rb") as f:
+				data = f.read()
+			# Lengths separate the parts, so no two inputs hash the same bytes.
+			h.update(len(data).to_bytes(8, "little"))
+			h.update(data)
+		
+		goal_bytes = b"" if goal is None else goal.encode()
+		h.update(len(goal_bytes).to_bytes(8, "little"))
+		h.update(goal_bytes)
+		h.update(spgt_version().encode())
+		h.update(translator_digest())
+		if integer_ids:
+			h.update(b"integer_ids")
+		return h.hexdigest()
+	
+	def __entry_path(self, key: str) -> str:
+		return os.path.join(self.cache_dir, key + ".json")
+	
+	def get(self, key: str) -> CachedTranslation | None:
+		'''
+		Returns the cached translation for key, or None if there is none.
+		'''
+		path = self.__entry_path(key)
+		try:
+			with open(path, "r") as f:
+				entry = CachedTranslation.from_json(f.read())
+		except (OSError, ValueError, KeyError):
+			return None
+		
+		# Mark it as recently used, unless another run has evicted it since it was read.
+		with contextlib.suppress(OSError):
+			os.utime(path)
+		return entry
+	
+	def put(self, key: str, entry: CachedTranslation):
+		'''
+		Stores entry under key, then evicts old entries if the cache is too large.
+		'''
+		path = self.__entry_path(key)
+		# Write to a temporary file first, so concurrent runs never read half an entry.
+		tmp_path = f"{path}.{os.getpid()}.tmp"
+		with open(tmp_path, "w") as f:
+			f.write(entry.to_json())
+		os.replace(tmp_path, path)
+		self.evict()
+	
+	def evict(self):
+		'''
+		Removes the least recently used entries until the cache fits in `max_bytes`.
+		'''
+		entries = []
+		for name in os.listdir(self.cache_dir):
+			if not name.endswith(".json"):
+				continue
+			path = os.path.join(self.cache_dir, name)
+			try:
+				stat = os.stat(path)
+			except OSError:
+				continue
+			entries.append((stat.st_mtime, stat.st_size, path))
+		
+		total = sum(size for _, size, _ in entries)
+		for _, size, path in sorted(entries):
+			if total <= self.max_bytes:
+				break
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+			total -= size
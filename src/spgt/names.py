@@ -11,4 +11,14 @@ ASP_PPLTL_PLANNER_PATH = os.path.abspath(os.path.join(ASP_CODE_DIR, "reg_var_ppl
 ASP_REGRESSOR_PATH  = os.path.abspath(os.path.join(ASP_CODE_DIR, "regressor_variable.lp"))
 ASP_PPLTL_REGRESSOR_PATH  = os.path.abspath(os.path.join(ASP_CODE_DIR, "regressor_var_ppltl.lp"))
 
-ASP_CLINGRAPH_PATH = os.path.abspath(os.path.join(ASP_CODE_DIR, "clingraph_generator.lp"))
\ No newline at end of file
+ASP_CLINGRAPH_PATH = os.path.abspath(os.path.join(ASP_CODE_DIR, "clingraph_generator.lp"))
+
+ASP_SHOW_CONTROLLER_PATH = os.path.abspath(os.path.join(ASP_CODE_DIR, "show_controller.lp"))
+ASP_SHOW_GRAPH_PATH = os.path.abspath(os.path.join(ASP_CODE_DIR, "show_graph.lp"))
+
+ASP_INC_STRONG_PATH = os.path.abspath(os.path.join(ASP_CODE_DIR, "strong_rules_inc.lp"))
+
+ASP_INC_PLANNER_PATH = os.path.abspath(os.path.join(ASP_CODE_DIR, "regression_variable_planner_inc.lp"))
+ASP_INC_PPLTL_PLANNER_PATH = os.path.abspath(os.path.join(ASP_CODE_DIR, "reg_var_ppltl_planner_inc.lp"))
+
+ASP_INC_CLINGRAPH_PATH = os.path.abspath(os.path.join(ASP_CODE_DIR, "clingraph_generator_inc.lp"))
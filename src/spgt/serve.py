@@ -0,0 +1,261 @@
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import threading
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from time import perf_counter
+
+# How many lifted domains each worker keeps, least recently used first out.
+MAX_DOMAINS = 16
+
+# The only flags requests may give, which change how problems are solved but never
+# which files are read, written or run.
+ALLOWED_FLAGS = frozenset([
+	"--incremental", "--jobs", "--portfolio", "--subprocess", "--symbols", "--integer_ids",
+	"--stream", "--start_size", "--search", "--first_sat", "--ppltl", "--strong", "--time_limit",
+])
+
+# Set in each worker process by `_init_worker`, and kept between requests.
+_worker_cache_dir: str | None = None
+_worker_work_dir: str | None = None
+_worker_domains: OrderedDict = OrderedDict()
+
+def _init_worker(cache_dir: str | None, work_dir: str | None):
+	global _worker_cache_dir, _worker_work_dir
+	_worker_cache_dir = cache_dir
+	_worker_work_dir = work_dir
+	# Pay for the slow imports before the first request, rather than during it.
+	import spgt.translator
+
+def _lifted_domain(domain_path: str):
+	'''
+	The parsed and normalised domain at domain_path, reused until the file changes.
+	'''
+	from spgt.translator import Translator
+	stat = os.stat(domain_path)
+	key = (domain_path, stat.st_mtime_ns, stat.st_size)
+	lifted = _worker_domains.pop(key, None)
+	if lifted is None:
+		lifted = Translator.lift_domain(domain_path)
+	_worker_domains[key] = lifted
+	while len(_worker_domains) > MAX_DOMAINS:
+		_worker_domains.popitem(last=False)
+	return lifted
+
+def _is_number(s: str) -> bool:
+	try:
+		float(s)
+	except ValueError:
+		return False
+	return True
+
+def request_argv(request: Dict, temp_dir: str, cache_dir: str | None = None) -> List[str]:
+	'''
+	The spgt command line for a request, which holds the `domain` and `problem` files,
+	and optionally a `goal` and a list of other `flags`, which must be in ALLOWED_FLAGS.
+	The controller is saved in temp_dir, and translations cached in cache_dir.
+	'''
+	if not isinstance(request, dict) or not isinstance(request.get("domain"), str) \
+			or not isinstance(request.get("problem"), str):
+		raise ValueError("requests must give the domain and problem files.")
+	flags = request.get("flags", [])
+	if not isinstance(flags, list) or not all(isinstance(f, str) for f in flags):
+		raise ValueError("flags must be a list of strings.")
+	for flag in flags:
+		if not flag.startswith("-") or _is_number(flag):
+			# The value of the flag before, which argparse rejects if there is none.
+			continue
+		if flag.split("=", 1)[0] not in ALLOWED_FLAGS:
+			raise ValueError(f"flag not allowed: {flag}")
+	
+	argv = [request["domain"], request["problem"], "-td", temp_dir]
+	if cache_dir is not None:
+		argv += ["--cache_dir", cache_dir]
+	argv += flags
+	if request.get("goal") is not None:
+		# Joined to its flag, so goals starting with - are not taken for flags.
+		argv.append(f"--goal={request['goal']}")
+	return argv
+
+def solve_request(request: Dict) -> Dict:
+	'''
+	Solves a single request in a worker, returning its controller as a dictionary
+	from each of `node`, `policy` and `next` to a list of argument lists.
+	Invalid requests raise a ValueError.
+	'''
+	from spgt.__main__ import get_args, parse_clingo_args, solve_problem
+	from spgt.solver import parse_controller
+	
+	start = perf_counter()
+	temp_dir = tempfile.mkdtemp(prefix="request-", dir=_worker_work_dir)
+	try:
+		try:
+			args = get_args(argv=request_argv(request, temp_dir, _worker_cache_dir))
+		except SystemExit:
+			# argparse has already printed why.
+			raise ValueError(f"invalid flags: {request.get('flags')}")
+		if args.goal in ['?', 'TELLME']:
+			raise ValueError("goals cannot be chosen interactively.")
+		for path in [args.domain, args.problem]:
+			if not os.path.isfile(path):
+				raise ValueError(f"no such file: {path}")
+		args.clingo_args = parse_clingo_args(args.clingo_args)
+		
+		output = solve_problem(args, _lifted_domain(args.domain))
+	finally:
+		# Controllers are only kept if the request gave its own directory.
+		shutil.rmtree(temp_dir, ignore_errors=True)
+	
+	controller = parse_controller(output) if output else None
+	return {
+		"domain": args.domain,
+		"problem": args.problem,
+		"solved": bool(output),
+		"nodes": len(controller["node"]) if controller else None,
+		"controller": controller,
+		"time": perf_counter() - start,
+	}
+
+class _RequestHandler(BaseHTTPRequestHandler):
+	'''
+	POST /solve with a JSON request solves it, and GET /status describes the server.
+	'''
+	def __reply(self, code: int, body: Dict):
+		data = json.dumps(body).encode()
+		self.send_response(code)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+	
+	def do_GET(self):
+		if self.path != "/status":
+			self.__reply(404, {"error": f"unknown path {self.path}"})
+			return
+		from spgt.cache import spgt_version
+		self.__reply(200, {"version": spgt_version(), "workers": self.server.workers})
+	
+	def do_POST(self):
+		if self.path != "/solve":
+			self.__reply(404, {"error": f"unknown path {self.path}"})
+			return
+		
+		# Browsers may send text/plain to any address without asking, but never application/json.
+		if self.headers.get_content_type() != "application/json":
+			self.__reply(415, {"error": "requests must be sent as application/json."})
+			return
+		
+		try:
+			length = int(self.headers.get("Content-Length", 0))
+			request = json.loads(self.rfile.read(length))
+		except ValueError:
+			self.__reply(400, {"error": "requests must be JSON."})
+			return
+		
+		try:
+			result = self.server.solve(request)
+		except ValueError as e:
+			self.__reply(400, {"error": str(e)})
+			return
+		except Exception as e:
+			self.__reply(500, {"error": repr(e)})
+			return
+		self.__reply(200, result)
+
+class SolverServer(ThreadingHTTPServer):
+	'''
+	An HTTP server solving requests in a pool of `workers` processes.
+	Each worker keeps the domains it has normalised, and translations are cached in cache_dir.
+	'''
+	def __init__(self, host: str = "127.0.0.1", port: int = 8765, workers: int = 1, cache_dir: str | None = None):
+		super().__init__((host, port), _RequestHandler)
+		self.workers = workers
+		self.cache_dir = cache_dir
+		# Requests' temporary files, which workers stopped mid-request would otherwise leave behind.
+		self.work_dir = tempfile.mkdtemp(prefix="spgt-serve-")
+		self.pool_lock = threading.Lock()
+		self.pool = self.__new_pool()
+	
+	def __new_pool(self) -> ProcessPoolExecutor:
+		# Workers are started from the handler threads, which is only safe when they are spawned.
+		return ProcessPoolExecutor(
+			max_workers=self.workers,
+			mp_context=multiprocessing.get_context("spawn"),
+			initializer=_init_worker,
+			initargs=(self.cache_dir, self.work_dir)
+		)
+	
+	def solve(self, request: Dict) -> Dict:
+		'''
+		Solves request in the pool, waiting for a free worker if they are all busy.
+		'''
+		pool = self.pool
+		try:
+			return pool.submit(solve_request, request).result()
+		except BrokenProcessPool:
+			# A worker died, which leaves the whole pool unusable, so later requests get a new one.
+			with self.pool_lock:
+				if self.pool is pool:
+					self.pool = self.__new_pool()
+			raise
+	
+	def server_close(self):
+		super().server_close()
+		self.pool.shutdown(wait=False, cancel_futures=True)
+		# Stop any requests still being solved, rather than waiting for them.
+		for proc in multiprocessing.active_children():
+			proc.terminate()
+			proc.join()
+		shutil.rmtree(self.work_dir, ignore_errors=True)
+
+def get_serve_args(argv: List[str] | None = None):
+	parser = argparse.ArgumentParser(
+		"spgt serve",
+		description="""Solves problems sent as JSON to POST /solve, keeping normalised domains
+		and translated instances between requests."""
+	)
+	parser.add_argument('--host', type=str, default="127.0.0.1",
+					 help="The address to listen on. Defaults to only this machine.")
+	parser.add_argument('--port', type=int, default=8765,
+					 help="The port to listen on, or 0 to choose any free port.")
+	parser.add_argument('--workers', type=int, default=os.cpu_count(),
+					 help="How many requests to solve at once.")
+	parser.add_argument('--cache_dir', type=str,
+					 help="""A directory to cache translated instances in.
+					 Defaults to a temporary directory removed when the server stops.""")
+	return parser.parse_args(argv)
+
+def _interrupt(signum, frame):
+	raise KeyboardInterrupt
+
+def serve(args):
+	'''
+	Runs the server until it is interrupted, or terminated.
+	'''
+	# Service managers stop the server with SIGTERM rather than Ctrl-C.
+	signal.signal(signal.SIGTERM, _interrupt)
+	
+	cache_dir = args.cache_dir
+	if cache_dir is None:
+		cache_dir = tempfile.mkdtemp(prefix="spgt-cache-")
+	
+	server = SolverServer(args.host, args.port, args.workers, cache_dir)
+	host, port = server.server_address[:2]
+	print(f"Serving on http://{host}:{port} with {args.workers} workers.")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		if args.cache_dir is None:
+			shutil.rmtree(cache_dir, ignore_errors=True)
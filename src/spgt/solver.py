@@ -1,18 +1,41 @@
+import csv
+import json
+import math
+import re
 import subprocess
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-from clingraph.orm import Factbase
-from clingraph.graphviz import compute_graphs, render
 from clingo import Control
 from clingo import Model
+from clingo import Function, Number, Symbol, String, SymbolType, parse_term
 
-from typing import List, AnyStr
+from typing import IO, List, Dict, AnyStr, Tuple
 
-from time import time
+from time import time, perf_counter
 
 from spgt.names import ASP_PPLTL_PLANNER_PATH, \
 		ASP_PLANNER_PATH, ASP_REGRESSOR_PATH, \
 		ASP_PPLTL_REGRESSOR_PATH, ASP_CLINGRAPH_PATH, \
-		ASP_STRONG_PATH
+		ASP_STRONG_PATH, ASP_INC_PLANNER_PATH, \
+		ASP_INC_PPLTL_PLANNER_PATH, ASP_INC_CLINGRAPH_PATH, \
+		ASP_INC_STRONG_PATH, ASP_SHOW_CONTROLLER_PATH, \
+		ASP_SHOW_GRAPH_PATH
+
+# Clingo configurations raced against each other by the portfolio mode,
+# as (name, arguments) pairs. The first `--portfolio` of them are used.
+PORTFOLIO = [
+	('tweety', ['--configuration=tweety']),
+	('trendy', ['--configuration=trendy', '--seed=1']),
+	('frumpy', ['--configuration=frumpy']),
+	('jumpy', ['--configuration=jumpy', '--seed=2']),
+	('crafty-vsids', ['--configuration=crafty', '--heuristic=Vsids', '--seed=3']),
+	('handy-berkmin', ['--configuration=handy', '--heuristic=Berkmin', '--seed=4']),
+	('tweety-domain', ['--configuration=tweety', '--heuristic=Domain', '--seed=5']),
+	('trendy-vmtf', ['--configuration=trendy', '--heuristic=Vmtf', '--seed=6']),
+]
 
 def filter_atoms(atoms: List[AnyStr], filter: List[AnyStr] = [], as_facts: bool = False) -> List[AnyStr]:
 	'''
@@ -21,62 +44,302 @@ def filter_atoms(atoms: List[AnyStr], filter: List[AnyStr] = [], as_facts: bool
 	`as_facts` means the returned listed contains facts, ending with a full stop, instead of just atoms.
 	'''
 	output_atoms = []
+	prefixes = tuple(filter)
 	for a in atoms:
-		if sum([a.startswith(r) for r in filter]):
+		if a.startswith(prefixes):
 			local_a = a
 			if as_facts:
 				local_a += "."
 			output_atoms.append(local_a)
 	return output_atoms
 
+# Separators between the atoms of a model in clingo's JSON output.
+_JSON_SEPARATORS = re.compile(r'[\s,]*')
+
+def _read_json_output(stream: IO) -> Tuple[AnyStr | None, List[AnyStr] | None]:
+	'''
+	Reads clingo's `--outf=2` JSON output from stream in chunks, as it is written.
+	Models are read atom by atom, so neither the whole document nor a whole model
+	is ever held as text. Only the atoms of the last model are kept.
+	returns the result clingo reports (e.g. "SATISFIABLE"), or None if it reports none,
+	and the atoms of the last model, or None if there was none.
+	'''
+	result, atoms = None, None
+	in_value = False
+	buffer = ""
+	for chunk in iter(lambda: stream.read(2**16), ""):
+		buffer += chunk
+		pos = 0
+		while pos < len(buffer):
+			if in_value:
+				# The atoms of each model are strings between `"Value": [` and `]`.
+				pos = _JSON_SEPARATORS.match(buffer, pos).end()
+				if pos == len(buffer):
+					break
+				if buffer[pos] == "]":
+					in_value = False
+					pos += 1
+					continue
+				try:
+					atom, pos = json.decoder.scanstring(buffer, pos+1)
+				except json.JSONDecodeError:
+					# The rest of this atom is in the next chunk.
+					break
+				atoms.append(atom)
+			else:
+				# Everything else is read a line at a time.
+				end = buffer.find("\n", pos)
+				if end < 0:
+					break
+				line = buffer[pos:end].strip()
+				pos = end + 1
+				if line == '"Value": [':
+					atoms = []
+					in_value = True
+				elif line.startswith('"Result":'):
+					result = json.loads(line[len('"Result":'):].rstrip(","))
+		buffer = buffer[pos:]
+	return result, atoms
+
+class ClingoSubprocess:
+	'''
+	Runs clingo as a subprocess on the input files with the `numNodes` parameter set to k,
+	reading its JSON output through a pipe as it is written.
+	Any file named `-` is read from `instance`, which is written to the subprocess' stdin.
+	
+	The subprocess starts straight away. `result` waits for it to finish,
+	and `cancel` may be called from any other thread to stop it early.
+	'''
+	def __init__(self, clingo_path: AnyStr,
+				 files: List[AnyStr],
+				 k: int = 1,
+				 extra_args: List[AnyStr] = [],
+				 instance: AnyStr | None = None):
+		args = [clingo_path]
+		args += files
+		args += ['-c', f'numNodes={k-1}', '--outf=2']
+		args += extra_args
+		
+		self.instance = instance
+		self.cancelled = False
+		# Errors are only read once clingo is done, so they must not fill a pipe.
+		self.stderr = tempfile.TemporaryFile("w+")
+		self.proc = subprocess.Popen(
+			args,
+			stdin=subprocess.DEVNULL if instance is None else subprocess.PIPE,
+			stdout=subprocess.PIPE,
+			stderr=self.stderr,
+			text=True
+		)
+	
+	def __write_instance(self):
+		try:
+			self.proc.stdin.write(self.instance)
+			self.proc.stdin.close()
+		except OSError:
+			# clingo stopped before reading it all.
+			pass
+	
+	def result(self) -> List[AnyStr] | bool | None:
+		'''
+		Waits for clingo to finish.
+		returns a list of strings representing a stable model, or False if no such model is found.
+		
+		Any error from clingo, or cancelling it, returns None.
+		'''
+		writer = None
+		if self.instance is not None:
+			# Written alongside reading, so neither side of the pipe blocks the other.
+			writer = threading.Thread(target=self.__write_instance, daemon=True)
+			writer.start()
+		
+		result, atoms = _read_json_output(self.proc.stdout)
+		self.proc.stdout.close()
+		self.proc.wait()
+		if writer is not None:
+			writer.join()
+		
+		self.stderr.seek(0)
+		errors = self.stderr.read()
+		self.stderr.close()
+		
+		if self.cancelled:
+			return None
+		
+		if result == "UNSATISFIABLE":
+			return False
+		
+		if result in ["SATISFIABLE", "OPTIMUM FOUND"] and atoms is not None:
+			return atoms
+		
+		# There must've been some kind of error, or the time limit was reached.
+		print(errors if errors else f"clingo finished with result {result}.")
+		return None
+	
+	def cancel(self):
+		'''
+		Stops clingo, if it is still running. `result` then returns None.
+		'''
+		self.cancelled = True
+		self.proc.kill()
+
 def _run_clingo_as_subprocess(clingo_path: AnyStr,
 							  files: List[AnyStr],
 							  k: int = 1, 
-							  extra_args: List[AnyStr] = []) -> List[AnyStr] | bool | None:
+							  extra_args: List[AnyStr] = [],
+							  instance: AnyStr | None = None) -> List[AnyStr] | bool | None:
 	'''
 	Runs clingo as a subprocess on the input files with the `numNodes` parameter set to k.
+	`instance` is written to clingo's stdin.
 	returns a list of strings representing a stable model, or False if no such model is found.
 	
 	Any error from clingo returns None.
 	'''
-	args = [clingo_path]
-	args += files
-	args += ['-c', f'numNodes={k-1}']
-	args += extra_args
+	return ClingoSubprocess(clingo_path, files, k, extra_args, instance).result()
+
+def _subprocess_extra_args(args, start_time: float) -> List[AnyStr]:
+	'''
+	The arguments given to every clingo subprocess, including
+	whatever remains of the time limit.
+	'''
+	remaining_time = args.time_limit - time() + start_time
+	extra_args = list(args.clingo_args)
 	
-	proc = subprocess.run(
-		args,
-		stdout=subprocess.PIPE,
-		stderr=subprocess.STDOUT,
-		text=True
-	)
+	# clingo takes whole seconds, and a limit of 0 means none at all.
+	if args.time_limit >= 0:
+		extra_args += [f'--time-limit={max(1, math.ceil(remaining_time))}']
+	return extra_args
+
+def _linear_search(start_size: int, attempt, first_sat: bool = False):
+	'''
+	Tries every size from `start_size` upwards until `attempt` finds a model.
+	The first model found is always minimal, so `first_sat` changes nothing.
+	returns the size and the output of `attempt` for it.
+	'''
+	output = False
+	num_nodes = start_size-1
+	while output == False:
+		num_nodes += 1
+		output = attempt(num_nodes)
+	return num_nodes, output
+
+def _gallop_search(start_size: int, attempt, first_sat: bool = False):
+	'''
+	Probes sizes `start_size`, `start_size+1`, `start_size+3`, ... with
+	doubling gaps until `attempt` finds a model, then binary searches
+	between the last unsatisfiable size and the satisfiable one.
+	Assumes any size above a satisfiable one is also satisfiable.
 	
-	if "UNSATISFIABLE" in proc.stdout:
-		return False
+	If `first_sat` is set, the first model found is returned without minimising.
+	returns the size and the output of `attempt` for it.
+	'''
+	lower = start_size-1
+	num_nodes = start_size
+	gap = 1
+	output = attempt(num_nodes)
+	while output == False:
+		lower = num_nodes
+		num_nodes += gap
+		gap *= 2
+		output = attempt(num_nodes)
+	
+	if output is None or first_sat:
+		return num_nodes, output
+	
+	upper = num_nodes
+	while upper - lower > 1:
+		mid = (lower + upper)//2
+		mid_output = attempt(mid)
+		# Out of time, or an error, so make do with the smallest controller found so far.
+		if mid_output is None:
+			return upper, output
+		if mid_output == False:
+			lower = mid
+		else:
+			upper, output = mid, mid_output
+	return upper, output
+
+def search_sizes(args, attempt):
+	'''
+	Searches controller sizes with the strategy given by `args.search`.
+	`attempt` takes a size and returns a model, False if there is none, or None on errors.
+	returns the size and the output of `attempt` for it.
+	'''
+	if args.search == 'gallop':
+		return _gallop_search(args.start_size, attempt, args.first_sat)
+	return _linear_search(args.start_size, attempt, args.first_sat)
+
+def _race_portfolio(clingo_path: AnyStr,
+					files: List[AnyStr],
+					k: int = 1,
+					extra_args: List[AnyStr] = [],
+					portfolio = PORTFOLIO,
+					instance: AnyStr | None = None):
+	'''
+	Runs a clingo subprocess for each configuration in the portfolio on the same size,
+	and kills the rest as soon as one of them finds whether a model exists.
+	returns the name of the winning configuration and its output,
+	which is None if every configuration failed.
+	'''
+	procs = {}
+	with ThreadPoolExecutor(max_workers=len(portfolio)) as pool:
+		running = {}
+		for name, config_args in portfolio:
+			procs[name] = ClingoSubprocess(clingo_path, files, k, extra_args + config_args, instance)
+			running[pool.submit(procs[name].result)] = name
 		
-	if "SATISFIABLE" in proc.stdout:
-		return proc.stdout.split('\n')
+		winner, output = None, None
+		while running and output is None:
+			done, _ = wait(running, return_when=FIRST_COMPLETED)
+			for fut in done:
+				name = running.pop(fut)
+				result = fut.result()
+				if output is None and result is not None:
+					winner, output = name, result
+		
+		for proc in procs.values():
+			proc.cancel()
 	
-	# There must've been some kind of error.
-	print(proc.stdout)
-	return None
+	return winner, output
+
+def _record_portfolio_winners(args, winners: List):
+	'''
+	Appends which configuration won for each size to `portfolio.csv` in the temporary directory,
+	so configurations may be compared across runs of the same domain.
+	'''
+	record_path = os.path.join(args.temp_dir, "portfolio.csv")
+	new_file = not os.path.isfile(record_path)
+	with open(record_path, "a", newline="") as f:
+		writer = csv.writer(f)
+		if new_file:
+			writer.writerow(["domain", "problem", "nodes", "configuration", "result"])
+		for num_nodes, name, output in winners:
+			writer.writerow([args.domain, args.problem, num_nodes, name, "SAT" if output else "UNSAT"])
 
-def solve_iteratively_subprocess(args, files, start_time):
+def solve_iteratively_subprocess(args, files, start_time, instance: AnyStr | None = None, stats: List[Dict] | None = None):
 	clingo_path = args.clingo_path
+	winners = []
 	
-	output = False
-	num_nodes = args.start_size-1
-	while output == False:
-		num_nodes += 1
+	def attempt(num_nodes):
 		print(f"Attempting to solve with {num_nodes} nodes.")
-		remaining_time = args.time_limit - time() + start_time
-		extra_args = ['--out-ifs=\\n']
-		extra_args += args.clingo_args
-		
-		if args.time_limit >= 0:
-			extra_args += [f'--time-limit={int(remaining_time)}']
+		extra_args = _subprocess_extra_args(args, start_time)
+		step_start = perf_counter()
+		if args.portfolio <= 1:
+			output = _run_clingo_as_subprocess(clingo_path, files, num_nodes, extra_args=extra_args, instance=instance)
+		else:
+			name, output = _race_portfolio(clingo_path, files, num_nodes, extra_args, PORTFOLIO[:args.portfolio], instance)
+			if output is not None:
+				print(f"Configuration {name} answered first.")
+				winners.append((num_nodes, name, output))
 		
-		output = _run_clingo_as_subprocess(clingo_path, files, num_nodes, extra_args=extra_args)
+		# Grounding and solving happen together in the subprocess.
+		_record_step(stats, num_nodes, None, perf_counter() - step_start, output)
+		return output
+	
+	num_nodes, output = search_sizes(args, attempt)
+	
+	if winners:
+		_record_portfolio_winners(args, winners)
 	
 	if output is None:
 		print('Failed to solve.')
@@ -85,8 +348,138 @@ def solve_iteratively_subprocess(args, files, start_time):
 	print(f"Solved with {num_nodes} nodes.")
 	return output
 
+def solve_parallel_subprocess(args, files, start_time, instance: AnyStr | None = None, stats: List[Dict] | None = None):
+	'''
+	Runs clingo subprocesses for `args.jobs` consecutive controller sizes at once.
+	Whenever a size is shown to be unsatisfiable the window moves along,
+	and whenever a size is satisfiable every larger size is killed.
+	Only returns once every smaller size is known to be unsatisfiable,
+	so the controller is still minimal.
+	A size which fails (e.g. runs out of time) bounds the search like a satisfiable one,
+	as no larger controller would be known to be minimal, but any smaller size may still be satisfiable.
+	The time each size took is appended to stats, other than those killed.
+	'''
+	clingo_path = args.clingo_path
+	
+	procs = {}
+	started = {}
+	results = {}
+	# The smallest size which is satisfiable or failed.
+	ceiling = None
+	next_k = args.start_size
+	
+	def kill_above(k):
+		for other_k, proc in procs.items():
+			if other_k > k:
+				proc.cancel()
+	
+	with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+		running = {}
+		while True:
+			while len(running) < args.jobs and (ceiling is None or next_k < ceiling):
+				print(f"Attempting to solve with {next_k} nodes.")
+				extra_args = _subprocess_extra_args(args, start_time)
+				started[next_k] = perf_counter()
+				procs[next_k] = ClingoSubprocess(clingo_path, files, next_k, extra_args, instance)
+				running[pool.submit(procs[next_k].result)] = next_k
+				next_k += 1
+			
+			done, _ = wait(running, return_when=FIRST_COMPLETED)
+			for fut in done:
+				k = running.pop(fut)
+				proc = procs.pop(k)
+				# Killed because a smaller size was satisfiable or failed.
+				if ceiling is not None and k > ceiling:
+					continue
+				
+				output = fut.result()
+				# Grounding and solving happen together in the subprocess.
+				_record_step(stats, k, None, perf_counter() - started[k], output)
+				results[k] = output
+				if output != False:
+					ceiling = k
+					kill_above(k)
+			
+			if ceiling is not None and all(results.get(k) == False for k in range(args.start_size, ceiling)):
+				break
+	
+	if results[ceiling] is None:
+		print('Failed to solve.')
+		return []
+	
+	print(f"Solved with {ceiling} nodes.")
+	return results[ceiling]
+
+def _named_argument(atom: Symbol) -> int | None:
+	'''
+	The position of the argument of a controller or graph atom which names an action or effect, if any.
+	'''
+	args = atom.arguments
+	if atom.name == "policy" and len(args) == 2:
+		return 1
+	if atom.name == "next" and len(args) == 3:
+		return 1
+	# The action labelling a node, and the effect labelling an edge.
+	if atom.name == "attr" and len(args) == 4 \
+			and str(args[2]) == ("(label,action)" if str(args[0]) == "node" else "label") \
+			and args[3].type == SymbolType.Number:
+		return 3
+	return None
+
+def decode_model(model: List[AnyStr], names: List[str]) -> List[AnyStr]:
+	'''
+	Maps the integers naming actions and effects in the controller atoms of a model
+	back to their names in `names`, for instances translated with integer ids.
+	Other atoms are left unchanged.
+	'''
+	decoded = []
+	for a in model:
+		if not a.startswith(("policy(", "next(", "attr(")):
+			decoded.append(a)
+			continue
+		
+		atom = parse_term(a)
+		i = _named_argument(atom)
+		if i is None:
+			decoded.append(a)
+			continue
+		
+		args = list(atom.arguments)
+		args[i] = String(names[args[i].number])
+		decoded.append(str(Function(atom.name, args)))
+	return decoded
+
+def _term_value(term: Symbol) -> int | str:
+	if term.type == SymbolType.Number:
+		return term.number
+	if term.type == SymbolType.String:
+		return term.string
+	return str(term)
+
+def parse_controller(model: List[AnyStr]) -> Dict[str, List[Tuple]]:
+	'''
+	The controller in a model, as a sorted list of argument tuples
+	for each of `node/1`, `policy/2` and `next/3`, e.g. `{"policy": [(0, "climb_p0")], ...}`.
+	Numbers and strings become ints and strs, and other terms are kept as ASP.
+	'''
+	controller = {"node": [], "policy": [], "next": []}
+	for a in model:
+		if not a.startswith(("node(", "policy(", "next(")):
+			continue
+		atom = parse_term(a)
+		if len(atom.arguments) != {"node": 1, "policy": 2, "next": 3}[atom.name]:
+			continue
+		controller[atom.name].append(tuple(_term_value(t) for t in atom.arguments))
+	
+	for atoms in controller.values():
+		atoms.sort()
+	return controller
 
 def generate_graph(model: List[AnyStr], temp_dir: AnyStr):
+	# clingraph is slow to import, and only needed for graphs.
+	from clingraph.orm import Factbase
+	from clingraph.graphviz import compute_graphs, render
+	
 	facts = filter_atoms(model, ['node', 'edge', 'attr', 'graph'], as_facts=True)
 	
 	fb = Factbase()
@@ -99,42 +492,211 @@ def generate_graph(model: List[AnyStr], temp_dir: AnyStr):
 
 def atoms_from_model(model: Model):
 	'''
-	Takes as input a clingo model and returns a list of each atom as a string.
+	Takes as input a clingo model and returns a list of each shown atom as a string.
+	Without any `#show` directives, every atom is shown.
+	'''
+	return [str(a) for a in model.symbols(shown=True)]
+	
+def _add_instance(ctl: Control, instance: AnyStr | List[Symbol] | None):
+	'''
+	Adds the instance facts to the base program of ctl.
+	Strings are parsed as ASP, while clingo terms are added as facts
+	through the backend, skipping the parser entirely.
+	'''
+	if instance is None:
+		return
+	
+	if isinstance(instance, str):
+		ctl.add("base", [], instance)
+		return
+	
+	with ctl.backend() as backend:
+		for symbol in instance:
+			backend.add_rule([backend.add_atom(symbol)])
+
+def clingo_statistics(ctl: Control) -> Dict:
+	'''
+	Picks the most useful of clingo's statistics for the last solve call of ctl.
+	'''
+	stats = ctl.statistics
+	lp = stats['problem']['lp']
+	solvers = stats['solving']['solvers']
+	times = stats['summary']['times']
+	return {
+		"atoms": int(lp['atoms']),
+		"rules": int(lp['rules']),
+		"bodies": int(lp['bodies']),
+		"variables": int(stats['problem']['generator']['vars']),
+		"constraints": int(stats['problem']['generator']['constraints']),
+		"choices": int(solvers['choices']),
+		"conflicts": int(solvers['conflicts']),
+		"restarts": int(solvers['restarts']),
+		"total_time": times['total'],
+		"solve_time": times['solve'],
+		"cpu_time": times['cpu'],
+	}
+
+def _record_step(stats: List[Dict] | None, k: int, ground_time: float | None, solve_time: float, output, ctl: Control | None = None):
+	'''
+	Appends the timings of solving with k nodes to stats, if it is given,
+	along with clingo's own statistics if ctl is given.
+	'''
+	if stats is None:
+		return
+	step = {
+		"nodes": k,
+		"ground": ground_time,
+		"solve": solve_time,
+		# Errors, and running out of time, leave the answer unknown.
+		"result": "UNSAT" if output == False else ("UNKNOWN" if output is None else "SAT"),
+	}
+	if ctl is not None:
+		step["clingo"] = clingo_statistics(ctl)
+	stats.append(step)
+
+def _solve_until(ctl: Control, deadline: float | None = None) -> List[AnyStr] | bool | None:
+	'''
+	Solves the program grounded in ctl in the background, cancelling
+	the search if the time `deadline` passes before it finishes.
+	returns a list of strings representing the last stable model found, or False if no such model exists.
+	
+	If the search is cancelled before either is known, returns None.
 	'''
-	return [str(a) for a in model.symbols(atoms=True)]
+	found = []
+	def on_model(model):
+		found[:] = [atoms_from_model(model)]
 	
-def _create_and_solve(files: List[AnyStr], k: int = 1, extra_args: List[AnyStr] = []) -> List[AnyStr] | bool:
+	with ctl.solve(on_model=on_model, async_=True) as hdlr:
+		if deadline is not None and not hdlr.wait(max(deadline - time(), 0)):
+			hdlr.cancel()
+		result = hdlr.get()
+	
+	if found:
+		return found[0]
+	if result.unsatisfiable:
+		return False
+	return None
+
+def _create_and_solve(files: List[AnyStr], k: int = 1, extra_args: List[AnyStr] = [], instance: AnyStr | None = None, stats: List[Dict] | None = None, deadline: float | None = None, ground_times: List[float] | None = None) -> List[AnyStr] | bool | None:
 	'''
 	Uses the clingo python API to run clingo on the input files with the `numNodes` parameter set to k.
+	`instance` is added to the base program directly, without going through a file.
+	If `stats` is given, the grounding and solving times are appended to it.
 	returns a list of strings representing a stable model, or False if no such model is found.
+	
+	If the time `deadline` passes first, returns None. Grounding cannot be interrupted,
+	so it is not started if the last of `ground_times` would take it past the deadline.
+	The time spent grounding is appended to `ground_times`.
 	'''
+	if ground_times is None:
+		ground_times = []
+	# Larger sizes take at least as long to ground as smaller ones.
+	expected_ground = ground_times[-1] if ground_times else 0
+	if deadline is not None and time() + expected_ground >= deadline:
+		return None
 	
 	# mute terminal output and set controller size.
+	ground_start = perf_counter()
 	ctl = Control(['-c', f'numNodes={k-1}'] + extra_args)
 	for f in files:
 		ctl.load(f)
+	_add_instance(ctl, instance)
 	ctl.ground()
-		
-	with ctl.solve(yield_=True) as hdlr:
-		if hdlr.get().unsatisfiable:
-			return False
-		model = hdlr.model()
-	return atoms_from_model(model)
+	solve_start = perf_counter()
+	ground_times.append(solve_start - ground_start)
+	
+	output = _solve_until(ctl, deadline)
+	
+	_record_step(stats, k, solve_start - ground_start, perf_counter() - solve_start, output, ctl)
+	return output
 
-def solve_iteratively(args, files):
-	output = False
+def _report_search(num_nodes: int, output, deadline: float | None, timed_out: bool = False):
+	'''
+	Prints how a search through the Python API ended.
+	`timed_out` is whether any size was cut short by the deadline.
+	'''
+	if output and timed_out:
+		print(f"Solved with {num_nodes} nodes, but ran out of time before finding whether fewer suffice.")
+	elif output:
+		print(f"Solved with {num_nodes} nodes.")
+	elif output is None and deadline is not None:
+		# The Python API only gives up when out of time.
+		print("Ran out of time.")
+	else:
+		print("Failed to solve.")
+
+def solve_iteratively(args, files, instance: AnyStr | None = None, stats: List[Dict] | None = None, deadline: float | None = None):
+	'''
+	Solves each controller size in a new clingo Control through the Python API.
+	Every size shares the time until `deadline`, and solving is cancelled once it passes.
+	'''
 	clingo_args = args.clingo_args
+	ground_times = []
+	sizes_timed_out = []
+	
+	def attempt(num_nodes):
+		print(f"Attempting to solve with {num_nodes} nodes.")
+		output = _create_and_solve(files, num_nodes, extra_args=clingo_args, instance=instance, stats=stats, deadline=deadline, ground_times=ground_times)
+		if output is None:
+			sizes_timed_out.append(num_nodes)
+		return output
+	
+	num_nodes, output = search_sizes(args, attempt)
+	
+	_report_search(num_nodes, output, deadline, bool(sizes_timed_out))
+	return output if output else []
+
+def solve_incrementally(args, files, instance: AnyStr | None = None, stats: List[Dict] | None = None, deadline: float | None = None):
+	'''
+	Uses a single clingo Control with the multi-shot programs,
+	grounding one new node per step rather than the whole program for each size.
+	The `last(n)` external selects node n as the final node, and is released
+	when no controller of that size exists.
+	Solving is cancelled once the time `deadline` passes, and no step is
+	grounded if the last one would not have had time to ground.
+	'''
+	ground_start = perf_counter()
+	ctl = Control(args.clingo_args)
+	for f in files:
+		ctl.load(f)
+	_add_instance(ctl, instance)
+	ctl.ground([("base", [])])
+	
+	# Nodes below the starting size are never final.
+	for n in range(args.start_size-1):
+		ctl.ground([("step", [Number(n)])])
+		ctl.release_external(Function("last", [Number(n)]))
+	
+	output = False
 	num_nodes = args.start_size-1
+	ground_time = 0
 	while output == False:
 		num_nodes += 1
+		if deadline is not None and time() + ground_time >= deadline:
+			output = None
+			break
 		print(f"Attempting to solve with {num_nodes} nodes.")
 		
-		output = _create_and_solve(files, num_nodes, extra_args=clingo_args)
+		last = Function("last", [Number(num_nodes-1)])
+		ctl.ground([("step", [Number(num_nodes-1)])])
+		ctl.assign_external(last, True)
+		solve_start = perf_counter()
+		ground_time = solve_start - ground_start
+		
+		output = _solve_until(ctl, deadline)
+		
+		_record_step(stats, num_nodes, solve_start - ground_start, perf_counter() - solve_start, output, ctl)
+		ground_start = perf_counter()
+		if output == False:
+			ctl.release_external(last)
 	
-	print(f"Solved with {num_nodes} nodes.")
-	return output
+	_report_search(num_nodes, output, deadline)
+	return output if output else []
 
 def select_files(args) -> List[str]:
+	if args.incremental:
+		return select_incremental_files(args)
+	
 	files = [ASP_PLANNER_PATH, ASP_REGRESSOR_PATH]
 	if args.ppltl:
 		files = [ASP_PPLTL_PLANNER_PATH, ASP_PPLTL_REGRESSOR_PATH]
@@ -144,20 +706,87 @@ def select_files(args) -> List[str]:
 		
 	if args.strong:
 		files += [ASP_STRONG_PATH]
+	return files + _show_files(args)
+
+def select_incremental_files(args) -> List[str]:
+	files = [ASP_INC_PLANNER_PATH, ASP_REGRESSOR_PATH]
+	if args.ppltl:
+		files = [ASP_INC_PPLTL_PLANNER_PATH, ASP_PPLTL_REGRESSOR_PATH]
+	
+	if args.graph:
+		files += [ASP_INC_CLINGRAPH_PATH]
+	
+	if args.strong:
+		files += [ASP_INC_STRONG_PATH]
+	return files + _show_files(args)
+
+def _show_files(args) -> List[str]:
+	'''
+	The programs projecting models onto the controller, and its graph if one is drawn.
+	None are used if the full model is wanted.
+	'''
+	if args.full_model:
+		return []
+	
+	files = [ASP_SHOW_CONTROLLER_PATH]
+	if args.graph:
+		files += [ASP_SHOW_GRAPH_PATH]
 	return files
 	
-def solve(args, instance_file: AnyStr, start_time: float):
+def solve(args, instance: AnyStr | List[Symbol] | None, start_time: float, stats: List[Dict] | None = None, names: List[str] | None = None, instance_file: str | None = None):
+	'''
+	Solves the translated instance, given as a string of ASP facts or a list of clingo terms.
+	The facts are handed to clingo directly, through the Python API or
+	the subprocess' stdin, rather than being read from a file.
+	Alternatively, the instance may be given as `instance_file`, with `instance` None.
+	
+	If `stats` is given, the grounding and solving times for each size tried
+	are appended to it, along with clingo's statistics when using the Python API.
+	Subprocesses ground and solve together, so only their total time is given.
+	If the instance names things by integers, `names` gives the name of each,
+	and the actions and effects of the controller are named in the output.
+	
+	Solving stops once `args.time_limit` seconds have passed since `start_time`.
+	Through the Python API this is exact, and the smallest controller found by then is returned.
+	'''
+	
+	# Incremental and parallel solving both sweep sizes in order.
+	if args.search != 'linear':
+		args.incremental = False
+		args.jobs = 1
 	
 	files = select_files(args)
-	files += [instance_file]
+	if instance_file is not None:
+		files += [instance_file]
 	
-	if args.time_limit >= 0:
+	# The time limit counts from when spgt started.
+	deadline = start_time + args.time_limit if args.time_limit >= 0 else None
+	
+	# The portfolio races configurations within each size instead.
+	if args.portfolio > 1:
+		args.jobs = 1
 		args.subprocess = True
 	
-	if args.subprocess:
-		output = solve_iteratively_subprocess(args, files, start_time)
+	if args.jobs > 1:
+		args.subprocess = True
+	
+	if args.subprocess and instance is not None:
+		files += ['-']
+		# Terms can only be handed over as text.
+		if not isinstance(instance, str):
+			instance = "".join(f"{symbol}.\n" for symbol in instance)
+	
+	if args.subprocess and args.jobs > 1:
+		output = solve_parallel_subprocess(args, files, start_time, instance, stats)
+	elif args.subprocess:
+		output = solve_iteratively_subprocess(args, files, start_time, instance, stats)
+	elif args.incremental:
+		output = solve_incrementally(args, files, instance, stats, deadline)
 	else:
-		output = solve_iteratively(args, files)
+		output = solve_iteratively(args, files, instance, stats, deadline)
+	
+	if names is not None and output:
+		output = decode_model(output, names)
 	
 	if args.graph and len(output):
 		generate_graph(output, args.temp_dir)
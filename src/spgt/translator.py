@@ -4,11 +4,11 @@ import itertools
 import pddl
 from pddl import logic as lg
 
-from fondutils.normalizer import normalize
+from clingo import Function, Number, Symbol, SymbolType
 
 from spgt.asp.symbols import *
-from spgt.base.domain import GroundedAction, GroundedEffect
-from spgt.base.logic import Formula, Verum, Falsum, Atom, Neg, Conj, Disj, Assign, Variable, Value
+from spgt.base.domain import GroundedAction, GroundedEffect, SymbolTable
+from spgt.base.logic import Formula, Verum, Falsum, Atom, Neg, Conj, Disj, Assign, Variable, Value, UnaryOp, BinaryOp
 
 # Read in a domain file and a problem file
 # Ensure it's in the normalised form (oneof)
@@ -20,24 +20,45 @@ from spgt.base.logic import Formula, Verum, Falsum, Atom, Neg, Conj, Disj, Assig
 # Need an abstract representation of the problem which keeps track of a
 # map of formulas to their object identifiers. (including atoms etc)
 
+class LiftedDomain:
+	'''
+	The normalised domain and everything derived from it which does not depend on the
+	problem instance, so it may be shared by the Translators of many instances.
+	Built by `Translator.lift_domain`.
+	'''
+	def __init__(self, domain_path: str, domain, actions: Set, all_effects: List, predicates: Set, unchanging_predicates: Set[str], effect_literals: List[Tuple[Set, Set, Set]], effect_predicates: Dict[str, List[int]]):
+		self.domain_path = domain_path
+		self.domain = domain
+		self.actions = actions
+		self.all_effects = all_effects
+		self.predicates = predicates
+		self.unchanging_predicates = unchanging_predicates
+		# The (added, deleted) predicates of each effect with the (name, arguments) of the
+		# predicates its action requires, and
+		# predicate names to the indices of the effects which mention them.
+		self.effect_literals = effect_literals
+		self.effect_predicates = effect_predicates
+
 class Translator:
-	def __init__(self, domain_path: str, instance_path: str, predicate_map: Dict[str, str] = {}, process_immediate: bool = True):
+	def __init__(self, domain_path: str, instance_path: str, predicate_map: Dict[str, str] = {}, process_immediate: bool = True, lifted: LiftedDomain | None = None, prune_unreachable: bool = True, streaming: bool = False):
 		self.domain_path = domain_path
 		self.instance_path = instance_path
+		# When streaming, actions are only grounded as the instance is emitted, and are not kept.
+		# Pruning needs every action at once, so it is skipped.
+		self.streaming = streaming
+		self.prune_unreachable = prune_unreachable and not streaming
 		
-		self.domain = normalize(pddl.parse_domain(domain_path))
-		self.actions = set(self.domain.actions)
+		if lifted is None:
+			lifted = Translator.lift_domain(domain_path)
+		self.lifted = lifted
 		
-		self.all_effects = [a.effect for a in self.actions if not isinstance(a.effect, lg.base.OneOf)]
-		# We treat different non-deterministic outcomes as different effects.
-		for a in self.actions:
-			if not isinstance(a.effect, lg.base.OneOf):
-				continue
-			self.all_effects += a.effect._operands
+		self.domain = lifted.domain
+		self.actions = lifted.actions
+		self.all_effects = lifted.all_effects
 		
 		self.types = self.domain.types
 		
-		self.predicates = set(self.domain.predicates)
+		self.predicates = lifted.predicates
 		# to replace predicates which are only true for a single object with variables
 		self.predicate_map = predicate_map
 		
@@ -47,98 +68,274 @@ class Translator:
 		if self.instance.domain_name != self.domain.name:
 			raise ValueError("Incorrect domain type")
 		
+		# Indices over the instance, so grounding never rescans the initial state or objects.
+		self.initial_index = {}
+		self.initial_names_index = {}
+		for pred in self.instance.init:
+			self.initial_index.setdefault(pred.name, set()).add(pred.terms)
+			self.initial_names_index.setdefault(pred.name, set()).add(tuple(t.name for t in pred.terms))
+		
+		self.type_index = self.__index_objects_by_type()
 		
-		# Identify which predicates are not in effects, i.e. cannot be changed.
-		self.unchanging_predicates = set(p for p in self.__calculate_unchanging_predicates())
+		# Predicates which are not in effects, i.e. cannot be changed.
+		self.unchanging_predicates = lifted.unchanging_predicates
 		self.variables = set()
 		self.initial_values = set()
 		
-		self.unary_predicate_variable_lookup = {}
+		# Predicates represented by finite domain variables, mapped to the position of
+		# the argument giving the variable's value, and a lookup from the (lowercased)
+		# other arguments to the variable for them.
+		self.predicate_variable_lookup = {}
+		# Variable symbols to the lowercased values of their domain.
+		self.variable_domain_index = {}
 		
 		self.grounded_actions = set()
 		self.grounded_effects = set()
+		# Integers for every name in the instance, filled in by `as_integer_symbols`.
+		self.symbols = SymbolTable()
 		self.converted_goal = None
+		# Variables which only ever take their initial value, which pruning removes.
+		self.constants: Dict[str, str] = {}
 		
 		if process_immediate:
 			
-			# TODO: ground other predicates as variables preemptively and set their initial state.
 			self.ground()
 		
 		# TODO: Smarter way to instantiate actions based on intial state.
 		# Things like `next_fwd` in action preconditions. If it's never changed or added, don't even include it as a variable.
 		# self.converted_initial = set(f)
 	
+	@staticmethod
+	def lift_domain(domain_path: str, domain = None) -> LiftedDomain:
+		'''
+		Parses and normalises a domain, and identifies its effects and unchanging predicates.
+		The result may be given to any number of Translators for instances of that domain.
+		If `domain` is given, it is used instead of parsing the file, and must already be normalised.
+		'''
+		if domain is None:
+			# fondutils is slow to import, and not needed when the domain is given.
+			from fondutils.normalizer import normalize
+			domain = normalize(pddl.parse_domain(domain_path))
+		actions = set(domain.actions)
+		
+		all_effects = [a.effect for a in actions if not isinstance(a.effect, lg.base.OneOf)]
+		# We treat different non-deterministic outcomes as different effects.
+		for a in actions:
+			if not isinstance(a.effect, lg.base.OneOf):
+				continue
+			all_effects += a.effect._operands
+		
+		predicates = set(domain.predicates)
+		unchanging_predicates = Translator.__calculate_unchanging_predicates(predicates, all_effects)
+		
+		# The action of each effect, in the same order.
+		effect_actions = [a for a in actions if not isinstance(a.effect, lg.base.OneOf)]
+		effect_actions += [a for a in actions if isinstance(a.effect, lg.base.OneOf) for _ in a.effect._operands]
+		
+		effect_literals = []
+		effect_predicates = {}
+		for i, (e, a) in enumerate(zip(all_effects, effect_actions)):
+			e_positive = Translator.__get_positive_predicates(e)
+			e_negative = Translator.__get_negative_predicates(e)
+			required = set((p.name, tuple(t.name for t in p.terms)) for p in Translator.__get_positive_predicates(a.precondition))
+			effect_literals.append((e_positive, e_negative, required))
+			for name in set(p.name for p in e_positive | e_negative):
+				effect_predicates.setdefault(name, []).append(i)
+		
+		return LiftedDomain(domain_path, domain, actions, all_effects, predicates, unchanging_predicates, effect_literals, effect_predicates)
+	
 	def is_ppltl(self):
 		for f in [self.converted_goal] + [a.precondition for a in self.grounded_actions]:
 			if f.is_ppltl():
 				return True
 		return False
 	
-	def __identify_unary_variables(self):
+	def __identify_invariant_variables(self):
 		'''
-		Identifies which predicates may be mapped one-to-one to variables.
-		Yields key value pairs of predicate names to variables.
-		Adds the variables to internal variable set automatically.
+		Identifies groups of predicates of which exactly one holds, for one value of one
+		of their arguments, for each choice of the others. Each choice becomes a finite domain variable.
+		e.g. `(at ?robot ?location)` becomes one variable for each robot, whose value is its location,
+		and if packages are either `(at ?package ?location)` or `(in ?package ?truck)`, one
+		variable for each package takes values `at(location)` or `in(truck)`.
+		Yields key value pairs of predicate names to (value position, variable lookup, whether values name the predicate).
+		Adds the variables and their initial values to the internal sets automatically.
 		'''
-		
-		for pred in self.predicates:
-			if pred.arity != 1:
+		grouped = set()
+		# Sorted, so the same groups are found on every run.
+		for pred in sorted(self.predicates, key=lambda p: p.name):
+			if pred.arity == 0 or pred.name in grouped:
 				continue
 			
 			# ensure it does change
 			if pred.name in self.unchanging_predicates:
 				continue
 			
-			# ensure there is only one initial value:
-			init_values = self.__get_initial_values(pred)
-			if len(init_values) != 1:
-				continue
-			
-			# ensure whenever it changes, one value is added,
-			# and one is removed.
-			# i.e. it never holds for more than two objects at once.
-			skip = False
-			for e in self.all_effects:
-				e_positive = Translator.__get_positive_predicates(e)
-				e_negative = Translator.__get_negative_predicates(e)
+			# Values are usually the last argument, e.g. (at ?obj ?loc).
+			for position in reversed(range(pred.arity)):
+				members = self.__grow_invariant([(pred, position)], grouped)
+				if members is None:
+					continue
 				
-				positive_occurences = set(p for p in e_positive if p.name == pred.name)
-				negative_occurences = set(p for p in e_negative if p.name == pred.name)
+				groups = self.__invariant_groups(members)
+				if groups is None:
+					continue
 				
-				# ensure both sets are the same size and either 0 or 1.
-				if not (len(positive_occurences) in [0,1] and\
-					len(positive_occurences) == len(negative_occurences)):
-					skip = True
-					break
+				lookups = dict((p.name, {}) for p, _ in members)
+				for fixed, (variable, init_value) in groups.items():
+					self.variables.add(variable)
+					self.initial_values.add((variable, Value(init_value)))
+					for p, _ in members:
+						lookups[p.name][fixed] = variable
 				
+				qualified = len(members) > 1
+				for p, i in members:
+					grouped.add(p.name)
+					yield (p.name, (i, lookups[p.name], qualified))
+				break
+	
+	# The most predicates combined into one variable.
+	MAX_INVARIANT_SIZE = 3
+	
+	def __grow_invariant(self, members: List[Tuple], grouped: Set[str]) -> List[Tuple] | None:
+		'''
+		Returns a list of (predicate, value position) pairs containing members, such that every
+		effect which adds one of them deletes one with the same other arguments, and vice versa.
+		Members are added for the predicates effects exchange with the given ones.
+		Returns None if there is no such group.
+		'''
+		extensions = self.__unbalanced_extensions(members)
+		if extensions is None:
+			return None
+		if not extensions:
+			return members
+		if len(members) == Translator.MAX_INVARIANT_SIZE:
+			return None
+		
+		for pred, position in extensions:
+			if pred.name in grouped or pred.name in self.unchanging_predicates:
+				continue
+			grown = self.__grow_invariant(members + [(pred, position)], grouped)
+			if grown is not None:
+				return grown
+		return None
+	
+	def __unbalanced_extensions(self, members: List[Tuple]) -> List[Tuple] | None:
+		'''
+		Checks that every effect which changes a member adds exactly one member and deletes exactly one,
+		with the same other arguments and a different value, which its action requires to hold.
+		Returns None if an effect breaks this irreparably, otherwise the (predicate, value position)
+		pairs which might balance the effects that only add or only delete a member.
+		'''
+		positions = dict((p.name, i) for p, i in members)
+		fixed_arity = members[0][0].arity - 1
+		
+		def key(atom):
+			return tuple(t.name for i, t in enumerate(atom.terms) if i != positions[atom.name])
+		
+		extensions = []
+		effects = set(i for p, _ in members for i in self.lifted.effect_predicates.get(p.name, []))
+		for e in sorted(effects):
+			e_positive, e_negative, required = self.lifted.effect_literals[e]
+			added = [p for p in e_positive if p.name in positions]
+			deleted = [p for p in e_negative if p.name in positions]
+			
+			if len(added) == 1 and len(deleted) == 1:
+				a, d = added[0], deleted[0]
+				if key(a) != key(d):
+					return None
 				# check something actually changes,
 				# i.e. it doesn't add then delete the same value.
-				if len(positive_occurences) == 1:
-					added = positive_occurences.pop().terms[0]
-					deleted = negative_occurences.pop().terms[0]
-					if added == deleted:
-						skip = True
-						break
-			
-			if skip:
+				if a.name == d.name and a.terms[positions[a.name]].name == d.terms[positions[d.name]].name:
+					return None
+				# the deleted value must hold, or the added one could be a second.
+				if (d.name, tuple(t.name for t in d.terms)) not in required:
+					return None
 				continue
 			
-			var_domain = [
-				obj.name for t in pred.terms[0].type_tags for obj in self.__objects_of_type(t)
-			]
+			if len(added) + len(deleted) != 1:
+				return None
 			
-			variable = Variable(pred.name, var_domain)
-			self.variables.add(variable)
-			
-			self.initial_values.add((variable, Value(init_values.pop()[0].name)))
+			# Look for another predicate with the same other arguments the effect changes the other way.
+			if added:
+				atom, others = added[0], e_negative
+			else:
+				atom, others = deleted[0], e_positive
+			for other in others:
+				if other.name in positions or other.arity != fixed_arity + 1:
+					continue
+				for i in range(other.arity):
+					if tuple(t.name for j, t in enumerate(other.terms) if j != i) == key(atom):
+						extensions.append((other, i))
+			if not extensions:
+				return None
+		return extensions
+	
+	def __invariant_groups(self, members: List[Tuple]) -> Dict | None:
+		'''
+		Checks that exactly one of the members holds initially for each choice of their other
+		arguments. If so, returns a dictionary from the (lowercased) other arguments to their
+		variable and its initial value. Otherwise returns None.
+		'''
+		def objects_of(term):
+			return [obj for t in term.type_tags for obj in self.__objects_of_type(t)]
+		
+		def other_terms(pred, position):
+			return [t for i, t in enumerate(pred.terms) if i != position]
+		
+		# The other arguments of every member must have the same types.
+		first_pred, first_position = members[0]
+		fixed_types = [set(t.type_tags) for t in other_terms(first_pred, first_position)]
+		if any([set(t.type_tags) for t in other_terms(p, i)] != fixed_types for p, i in members):
+			return None
+		
+		# Values name their predicate when several are combined.
+		qualified = len(members) > 1
+		def value_name(pred, obj) -> str:
+			return f"{pred.name}({obj})" if qualified else str(obj)
+		
+		var_domain = [value_name(p, obj.name) for p, i in members for obj in objects_of(p.terms[i])]
+		domain_names = set(v.lower() for v in var_domain)
+		
+		# ensure there is exactly one initial value for every choice of the other arguments.
+		init_values = {}
+		for p, i in members:
+			for tup in self.__get_initial_values(p):
+				fixed = tuple(str(o).lower() for j, o in enumerate(tup) if j != i)
+				value = value_name(p, tup[i].name)
+				if fixed in init_values or value.lower() not in domain_names:
+					return None
+				init_values[fixed] = value
+		
+		groups = {}
+		for choice in itertools.product(*[objects_of(t) for t in other_terms(first_pred, first_position)]):
+			fixed = tuple(str(obj).lower() for obj in choice)
+			if fixed not in init_values:
+				return None
 			
-			yield (pred.name, variable)
+			# Lone unary predicates keep their name, others are named by their other arguments.
+			name = "/".join(p.name for p, _ in members)
+			if choice:
+				name += "(" + ",".join(obj.name for obj in choice) + ")"
+			groups[fixed] = (Variable(name, var_domain), init_values.pop(fixed))
+		
+		# Initial values for objects of the wrong type.
+		if init_values:
+			return None
+		
+		return groups
+	
+	def __index_variable_domains(self):
+		# PDDL names are case-insensitive, so values are compared lowercased.
+		self.variable_domain_index = dict(
+			(var.symbol, set(str(v).lower() for v in var.domain))
+			for _, lookup, _ in self.predicate_variable_lookup.values() for var in lookup.values()
+		)
 	
 	def __get_variable(self, predicate, mappings: Dict[AnyStr, AnyStr] = {}, check_exists: bool = True):
 		'''
 		Returns the Variable,Value pair corresponding to a given predicate.
 		May may be a grounded predicate with True/False value, may be a
-		predicate represented as a unary variable.
+		predicate represented as a finite domain variable.
 		'''
 		# if we're given a variable use the mapping,
 		# if it's a constant use it's value.
@@ -156,15 +353,22 @@ class Translator:
 		
 		
 		
-		if predicate.name in self.unary_predicate_variable_lookup:
+		if predicate.name in self.predicate_variable_lookup:
 			# Lookup associated variable, and if it is in the mappings,
 			# return the corresponding Assign(Var, Val).
 			
-			var = self.unary_predicate_variable_lookup[predicate.name]
-			term = predicate.terms[0]
-			value = map_term(term)
+			position, lookup, qualified = self.predicate_variable_lookup[predicate.name]
+			mapped_terms = [map_term(t) for t in predicate.terms]
+			value = mapped_terms[position]
+			if qualified:
+				value = f"{predicate.name}({value})"
+			fixed = tuple(str(v).lower() for i, v in enumerate(mapped_terms) if i != position)
 			
-			if not value in var.domain:
+			if fixed not in lookup:
+				raise ValueError("Predicate has arguments for which there is no corresponding variable.")
+			var = lookup[fixed]
+			
+			if not str(value).lower() in self.variable_domain_index[var.symbol]:
 				raise ValueError("Predicate assigned to value which is not in corresponding variable domain.")
 			
 			return var, Value(value)
@@ -194,7 +398,7 @@ class Translator:
 				term_choices += [(term.name, obj.name) for obj in self.__objects_of_type(t_type)]
 			choices.append(term_choices)
 		
-		inits_as_str = [tuple(t.name for t in i) for i in self.__get_initial_values(predicate)]
+		inits_as_str = self.initial_names_index.get(predicate.name, set())
 		for choice in itertools.product(*choices):
 			mapping = dict(choice)
 			
@@ -204,7 +408,7 @@ class Translator:
 				yield var, Value(ASP_TRUE_VALUE)
 			else:
 				yield var, Value(ASP_FALSE_VALUE)
-
+	
 	def ground(self):
 		'''
 		Ground the domain.
@@ -215,77 +419,230 @@ class Translator:
 		
 		# Non-trivial variables
 		# Sets the initial values on it's own.
-		self.unary_predicate_variable_lookup = dict(self.__identify_unary_variables())
+		self.predicate_variable_lookup = dict(self.__identify_invariant_variables())
+		self.__index_variable_domains()
 		
 		for p in self.predicates:
 			if p.name in self.unchanging_predicates:
 				continue
 			
-			if p.name in self.unary_predicate_variable_lookup.keys():
+			if p.name in self.predicate_variable_lookup.keys():
 				continue
 			
 			# We haven't converted it to a variable already, and it may change value,
 			# so we instantiate every choice as a binary variable, and then add them.
 			
 			# We get the initial values of the predicate.
-
+			
 			for var, val in self.__ground_predicate(p):
 				self.variables.add(var)
 				self.initial_values.add((var, val))
 			
 		# Actions.
-		for a in self.actions:
-			# also populates the grounded effects
-			self.grounded_actions.update(self.__instantiate_action(a))
+		if not self.streaming:
+			for a in self.__ground_actions():
+				self.grounded_actions.add(a)
+				self.grounded_effects.update(a.effects)
 		
 		# The goal shouldn't have any parameters in it, so we do not need
 		# a variable mapping
 		self.converted_goal = self.__convert_formula(self.instance.goal, {})
 		
-	def __get_initial_values(self, predicate) -> Set:
+		if self.prune_unreachable:
+			self.__prune_unreachable()
+	
+	@staticmethod
+	def __relaxed_holds(F: Formula, values: Dict[str, Set[str]]) -> bool:
 		'''
-		Returns a set of tuples of objects for which this predicate is initially true.
+		Whether F may hold in a relaxed state, where each variable takes all of the given values at once.
+		Formulae which are not propositional are assumed to hold.
+		'''
+		if isinstance(F, Assign):
+			var, val = F._sub
+			return val.symbol in values.get(var.symbol, ())
+		if isinstance(F, Neg) and isinstance(F._arg, Assign):
+			var, val = F._arg._sub
+			return any(v != val.symbol for v in values.get(var.symbol, ()))
+		if isinstance(F, Conj):
+			return all(Translator.__relaxed_holds(x, values) for x in F._sub)
+		if isinstance(F, Disj):
+			return any(Translator.__relaxed_holds(x, values) for x in F._sub)
+		if isinstance(F, Falsum):
+			return False
+		return True
+	
+	@staticmethod
+	def __watched_facts(F: Formula) -> Tuple[Set[Tuple[str, str]], Set[str]]:
+		'''
+		Returns the (variable, value) facts assigned in F, and the variables whose assignments are negated in F.
+		'''
+		positive, negative = set(), set()
+		to_visit = [F]
+		while to_visit:
+			G = to_visit.pop()
+			if isinstance(G, Assign):
+				var, val = G._sub
+				positive.add((var.symbol, val.symbol))
+			elif isinstance(G, Neg) and isinstance(G._arg, Assign):
+				negative.add(G._arg._sub[0].symbol)
+			elif isinstance(G, UnaryOp):
+				to_visit.append(G._arg)
+			elif isinstance(G, BinaryOp):
+				to_visit.extend(G._sub)
+		return positive, negative
+	
+	@staticmethod
+	def __fold_constants(F: Formula, constants: Dict[str, str]) -> Formula:
+		'''
+		Replaces assignments to the variables in constants with Verum or Falsum,
+		depending on whether they assign the variable's only value.
+		'''
+		if isinstance(F, Assign):
+			var, val = F._sub
+			if var.symbol not in constants:
+				return F
+			return Verum() if constants[var.symbol] == val.symbol else Falsum()
+		if isinstance(F, UnaryOp):
+			return type(F)(Translator.__fold_constants(F._arg, constants))
+		if isinstance(F, BinaryOp):
+			return type(F)(*[Translator.__fold_constants(x, constants) for x in F._sub])
+		return F
+	
+	def __prune_unreachable(self):
 		'''
-		s = set()
+		Removes the actions, effects and variable values which cannot be reached from
+		the initial state, using a relaxed reachability analysis in which every outcome
+		of an action happens at once and values are never deleted.
+		Variables which can only ever take their initial value are replaced by
+		constants in the preconditions and goal, and dropped along with every effect on them.
+		'''
+		values = {}
+		for var, val in self.initial_values:
+			values.setdefault(var.symbol, set()).add(val.symbol)
 		
-		for pred in list(self.instance.init):
-			if pred.name != predicate.name or pred.arity != pred.arity:
+		# Index each action by the facts its precondition depends on, so it is only
+		# checked again once one of them becomes reachable.
+		positive_watchers = {}
+		negative_watchers = {}
+		for a in self.grounded_actions:
+			positive, negative = Translator.__watched_facts(a.precondition)
+			for fact in positive:
+				positive_watchers.setdefault(fact, []).append(a)
+			for symbol in negative:
+				negative_watchers.setdefault(symbol, []).append(a)
+		
+		applicable = []
+		applied = set()
+		to_check = list(self.grounded_actions)
+		
+		def reach(symbol, value):
+			reached = values.setdefault(symbol, set())
+			if value in reached:
+				return
+			reached.add(value)
+			to_check.extend(positive_watchers.pop((symbol, value), ()))
+			to_check.extend(negative_watchers.get(symbol, ()))
+			# Once a variable has two values every negation of it holds, so it needn't be watched.
+			if len(reached) > 1:
+				negative_watchers.pop(symbol, None)
+		
+		while to_check:
+			a = to_check.pop()
+			if a in applied or not Translator.__relaxed_holds(a.precondition, values):
 				continue
 			
-			s.add(pred.terms)
-			
-		return s
+			applicable.append(a)
+			applied.add(a)
+			for e in a.effects:
+				for var, val in e.add:
+					reach(var.symbol, val.symbol)
+				# Deleting a boolean value sets the opposite one.
+				for var, val in e.delete:
+					if var.is_binary():
+						reach(var.symbol, ASP_FALSE_VALUE if val.symbol == ASP_TRUE_VALUE else ASP_TRUE_VALUE)
+		
+		constants = dict((symbol, next(iter(vals))) for symbol, vals in values.items() if len(vals) == 1)
+		
+		self.constants = constants
+		
+		# Constants only appear in effects which set their one value again, as any effect
+		# changing them would need a precondition which folds to false, so the effects are dropped.
+		constant_effects = {}
+		def without_constants(e: GroundedEffect) -> GroundedEffect:
+			if e not in constant_effects:
+				constant_effects[e] = GroundedEffect(e.name,
+					[(var, val) for var, val in e.add if var.symbol not in constants],
+					[(var, val) for var, val in e.delete if var.symbol not in constants])
+			return constant_effects[e]
+		
+		self.grounded_actions = set()
+		self.grounded_effects = set()
+		for a in applicable:
+			if constants:
+				precondition = Formula.simplify_constants(Translator.__fold_constants(a.precondition, constants))
+				a = GroundedAction(a.name, precondition, [without_constants(e) for e in a.effects])
+			self.grounded_actions.add(a)
+			self.grounded_effects.update(a.effects)
+		
+		if constants:
+			self.converted_goal = Formula.simplify_constants(Translator.__fold_constants(self.converted_goal, constants))
+		
+		# Booleans keep both values, as effects on them rely on flipping between the two.
+		pruned_variables = {}
+		for var in self.variables:
+			reachable_domain = [v for v in var.domain if v in values.get(var.symbol, ())]
+			if var.is_binary() or len(reachable_domain) == len(var.domain):
+				continue
+			pruned_variables[var] = Variable(var.symbol, reachable_domain)
+		
+		self.variables = set(pruned_variables.get(v, v) for v in self.variables if v.symbol not in constants)
+		self.initial_values = set((var, val) for var, val in self.initial_values if var.symbol not in constants)
+		for _, lookup, _ in self.predicate_variable_lookup.values():
+			for fixed, var in lookup.items():
+				lookup[fixed] = pruned_variables.get(var, var)
+		self.__index_variable_domains()
+		
+	def __get_initial_values(self, predicate) -> Set:
+		'''
+		Returns a set of tuples of objects for which this predicate is initially true.
+		'''
+		return set(self.initial_index.get(predicate.name, ()))
 	
-	def __calculate_unchanging_predicates(self) -> Set[str]:
+	@staticmethod
+	def __calculate_unchanging_predicates(predicates: Set, all_effects: List) -> Set[str]:
 		'''
 		Identifies which predicates do not appear in any effects,
 		and so can never change from the initial state
 		'''
-		predicates_in_effects = set([pred.name for effect in self.all_effects for pred in Translator.__get_predicates_in_formula(effect)])
-		return set([p.name for p in self.predicates]) - predicates_in_effects
+		predicates_in_effects = set([pred.name for effect in all_effects for pred in Translator.__get_predicates_in_formula(effect)])
+		return set([p.name for p in predicates]) - predicates_in_effects
 	
-	def __get_child_types(self, type_name: str):
+	def __index_objects_by_type(self) -> Dict[str, List]:
 		'''
-		Returns all type-children of the given type.
-		Assumes there are no circular dependencies in the type system.
+		Maps every type to the objects of that type or any of its subtypes,
+		in the order the objects are declared.
 		'''
-		for t in self.types:
-			if type_name == self.types[t]:
-				yield t
-				for sub_child in self.__get_child_types(t):
-					yield sub_child
-		
+		index = {}
+		for obj in self.objects:
+			# Every ancestor of the object's types also labels it.
+			labels = set()
+			to_visit = list(obj.type_tags)
+			while to_visit:
+				t = to_visit.pop()
+				if t is None or t in labels:
+					continue
+				labels.add(t)
+				to_visit.append(self.types.get(t))
+			
+			for t in labels:
+				index.setdefault(t, []).append(obj)
+		return index
+	
 	def __objects_of_type(self, type_name: str):
 		'''
 		Yields all objects of a certain type.
 		'''
-		# assert type_name in self.types
-		types = set(self.__get_child_types(type_name))
-		types.add(type_name)
-		for obj in self.objects:
-			# if one of our childtypes labels this object, then yield it.
-			if (set(obj.type_tags) & types):
-				yield obj
+		return iter(self.type_index.get(type_name, ()))
 		
 	def __predicate_to_var(self, predicate: lg.predicates.Predicate, mappings: Dict[AnyStr, AnyStr]={}):
 		'''
@@ -299,14 +656,13 @@ class Translator:
 		
 		if predicate.name in self.unchanging_predicates:
 			value = tuple(mappings[t.name] for t in predicate.terms)
-			inits_as_str = [tuple(t.name for t in i) for i in self.__get_initial_values(predicate)]
-			if value in inits_as_str:
+			if value in self.initial_names_index.get(predicate.name, ()):
 				return Verum()
 			return Falsum()
 		
 		var, val = self.__get_variable(predicate, mappings)
 		return Assign(var, val)
-
+	
 	def __convert_formula(self, F: lg.base.Formula, mappings: Dict[str, str]) -> Formula:
 		'''
 		Parses a PDDL Formula object into an equivalent formula in the Translator's type.
@@ -351,74 +707,112 @@ class Translator:
 			raise ValueError(f"Type '{type(F)}' not supported.")
 		
 		return switch[type(F)](F)
-
+	
 	def __parameter_possibilities(self, action):
 		'''
 		Yields all possible combinations of parameters to the action.
 		Does not generate those which are unable to satisfy the precondition based on unchanging predicate in the precondition.
 		Still specifies the values of the the unchanging predicates which allow the action to be executed.
+		
+		Parameters are bound by joining the initially true tuples of the unchanging predicates
+		in the precondition, most selective first, and then the objects of the remaining parameters.
+		Negated unchanging predicates remove bindings as soon as all their parameters are bound.
 		'''
 		# positive and negative literals in the precondition which are unchanging.
 		# We assume preconditions do not contain disjunctions.
 		requirements = [p for p in Translator.__get_positive_predicates(action.precondition) if p.name in self.unchanging_predicates]
 		prohibitions = [p for p in Translator.__get_negative_predicates(action.precondition) if p.name in self.unchanging_predicates]
 		
-		requirement_satisfiers = []
+		# Each join step binds some parameters from a relation of candidate tuples.
+		# Parameters in a requirement take values from its initially true tuples,
+		# the others (free parameters) may take any value of their type.
+		steps = []
 		for predicate in requirements:
-			# the rezipping is so we have ( (x,o1),(y,o2) ) where x and y are the parameters
-			# and predicate(o1, o2) is initially true.
-			pred_choices = [tuple(zip(predicate.terms, tup)) for tup in self.__get_initial_values(predicate)]
-			requirement_satisfiers.append(pred_choices)
-			
-		prohibited_choices = []
-		for predicate in prohibitions:
-			# the rezipping is so we have ( (x,o1),(y,o2) ) where x and y are the parameters
-			# and predicate(o1, o2) is initially true.
-			pred_choices = [set(zip(predicate.terms, tup)) for tup in self.__get_initial_values(predicate)]
-			prohibited_choices += pred_choices
-		
-		# other parameters which may take any value (of the specified type)
-		# we allow for those which occur in prohibitions because we will simply skip all prohibited values.
-		free_parameters = []
+			steps.append((predicate.terms, list(self.initial_index.get(predicate.name, ()))))
+		
+		required_names = set(t.name for pred in requirements for t in pred.terms)
 		for param in action.parameters:
-			if param.name not in [t.name for pred in requirements for t in pred.terms]:
-				free_parameters.append(param)
-	
-		free_choices = []
-		for param in free_parameters:
-			p_choices = []
-			for p_type in list(param.type_tags):
-				p_choices += [(param, obj) for obj in self.__objects_of_type(p_type)]
-			free_choices.append(p_choices)
-		
-		for choice_of_frees in itertools.product(*free_choices):
-			# if there are no free parameters, itertools will run this loop once
-			# with choice_of_frees = (), the empty tuple
+			if param.name in required_names:
+				continue
+			objects = [obj for p_type in list(param.type_tags) for obj in self.__objects_of_type(p_type)]
+			steps.append(((param,), [(obj,) for obj in objects]))
+		
+		steps = Translator.__order_join(steps)
+		
+		# Check each prohibition at the first step which binds all of its parameters.
+		bound = set()
+		unchecked = list(prohibitions)
+		checks_after = []
+		for terms, _ in steps:
+			bound.update(t.name for t in terms if isinstance(t, lg.terms.Variable))
+			checks = [p for p in unchecked if all(t.name in bound for t in p.terms if isinstance(t, lg.terms.Variable))]
+			unchecked = [p for p in unchecked if p not in checks]
+			checks_after.append(checks)
+		# Prohibitions without parameters still apply to actions without any.
+		checks_after.append(unchecked if not steps else [])
+		
+		def is_prohibited(predicate, binding: Dict) -> bool:
+			values = tuple(binding[t.name] if isinstance(t, lg.terms.Variable) else t for t in predicate.terms)
+			return values in self.initial_index.get(predicate.name, ())
+		
+		# Index every step's tuples on the parameters bound before it.
+		bound = set()
+		indices = []
+		for terms, tuples in steps:
+			key_positions = [i for i, t in enumerate(terms) if isinstance(t, lg.terms.Variable) and t.name in bound]
+			index = {}
+			for tup in tuples:
+				# Constants in a requirement must match the tuple exactly.
+				if any(not isinstance(t, lg.terms.Variable) and t != o for t, o in zip(terms, tup)):
+					continue
+				index.setdefault(tuple(tup[i] for i in key_positions), []).append(tup)
+			indices.append((terms, key_positions, index))
+			bound.update(t.name for t in terms if isinstance(t, lg.terms.Variable))
+		
+		def extend(i: int, binding: Dict):
+			if i == len(indices):
+				if not any(is_prohibited(p, binding) for p in checks_after[i]):
+					yield dict((name, str(obj)) for name, obj in binding.items())
+				return
 			
-			# loop through all possible choices of pre_quantified parameters
-			for choice_for_requirements in itertools.product(*requirement_satisfiers):
-				# merge choice_of_frees and choice_for_requirements into one tuple, asserting there are no prohibitions
-				s_free = set(choice_of_frees)
-				# merge the tuple of tuples of assigmments into a single tuple of assigmments into one set of assignments
-				s_req = set(assignment for tup in choice_for_requirements for assignment in tup)
-				# assert the choice of parameters to satisfy requirements don't contradict.
-				var_names = [a[0].name for a in s_req]
-				if len(var_names) != len(set(var_names)):
+			terms, key_positions, index = indices[i]
+			for tup in index.get(tuple(binding[terms[k].name] for k in key_positions), ()):
+				new_binding = dict(binding)
+				consistent = True
+				for t, obj in zip(terms, tup):
+					if not isinstance(t, lg.terms.Variable):
+						continue
+					# Parameters repeated within one predicate must take one value.
+					if new_binding.setdefault(t.name, obj) != obj:
+						consistent = False
+						break
+				if not consistent:
 					continue
-				
-				# if either of the sets makes a choice which contains a prohibition,
-				# skip it
-				if sum([(prohib <= s_req) or (prohib <= s_free) for prohib in prohibited_choices]):
+				if any(is_prohibited(p, new_binding) for p in checks_after[i]):
 					continue
-				
-				mapping = {}
-				mapping |= {p.name: str(obj) for p,obj in s_free}
-				# add required choice, overriding values taking in free_choice.
-				mapping |= {p.name: str(obj) for p,obj in s_req}
-				yield mapping
-		
-		return
+				yield from extend(i + 1, new_binding)
 		
+		yield from extend(0, {})
+	
+	@staticmethod
+	def __order_join(steps: List[Tuple]) -> List[Tuple]:
+		'''
+		Orders join steps so each binds as few new candidates as possible:
+		steps sharing parameters with those before them come first, smallest first.
+		'''
+		remaining = list(steps)
+		ordered = []
+		bound = set()
+		while remaining:
+			best = min(remaining, key=lambda step: (
+				not any(isinstance(t, lg.terms.Variable) and t.name in bound for t in step[0]),
+				len(step[1])
+			))
+			remaining.remove(best)
+			ordered.append(best)
+			bound.update(t.name for t in best[0] if isinstance(t, lg.terms.Variable))
+		return ordered
+	
 	def __create_action(self, action, mapping: Dict[str, str]):
 		"""
 		Instantiates an action with the given variable
@@ -440,29 +834,37 @@ class Translator:
 		if not isinstance(effect_formulas, list):
 			effect_formulas = [effect_formulas]
 			
-		new_effects = [GroundedEffect.from_formula(new_effect_name + f"_effect_{i}", eff_form) for i,eff_form in enumerate(effect_formulas)]
-		
-		self.grounded_effects.update(new_effects)
+		new_effects = []
+		for i, eff_form in enumerate(effect_formulas):
+			effect_name = new_effect_name + f"_effect_{i}"
+			new_effects.append(GroundedEffect.from_formula(effect_name, eff_form))
 		
 		return GroundedAction(new_name, new_prec, new_effects)
 	
 	def __instantiate_action(self, action):
-		new_actions = []
 		params = set(p.name for p in action.parameters)
 		
 		for mapping in self.__parameter_possibilities(action):
 			if params > set(mapping.keys()):
 				continue
-			new_actions.append(self.__create_action(action, mapping))
-		
-		return new_actions
+			yield self.__create_action(action, mapping)
+	
+	def __ground_actions(self):
+		'''
+		Yields every grounded action, one at a time.
+		'''
+		for a in self.actions:
+			yield from self.__instantiate_action(a)
 	
 	def overwrite_goal(self, new_goal: Formula):
 		'''
 		Overwrites the goal read from ASP with the given formula.
-		Does not perform any conversions or verification. If the new formula
+		Variables pruned as constants are replaced by whether they hold initially,
+		but no other conversions or verification are done. If the new formula
 		refers to nonexistent variables, the output program is simply invalid.
 		'''
+		if self.constants:
+			new_goal = Formula.simplify_constants(Translator.__fold_constants(new_goal, self.constants))
 		self.converted_goal = new_goal
 	
 	def save_ASP(self, path):
@@ -488,6 +890,15 @@ class Translator:
 		
 		yield "\n"
 		
+		if self.streaming:
+			for a in self.__ground_actions():
+				for r in a.as_ASP():
+					yield r + "\n"
+				for e in a.effects:
+					for r in e.as_ASP():
+						yield r + "\n"
+			return
+		
 		for a in self.grounded_actions:
 			for r in a.as_ASP():
 				yield r + "\n"
@@ -496,7 +907,67 @@ class Translator:
 		for e in self.grounded_effects:
 			for r in e.as_ASP():
 				yield r + "\n"
+	
+	def as_symbols(self):
+		'''
+		Yields the same facts as `as_ASP`, but as clingo terms,
+		so they may be added through the clingo backend without being parsed.
+		'''
+		for v in self.variables:
+			yield from v.as_symbols()
 		
+		for var, val in self.initial_values:
+			yield Function(ASP_INIT_SYMBOL, [make_safe_symbol(var.symbol), val.as_symbol()])
+		
+		yield Function(ASP_GOAL_SYMBOL, [self.converted_goal.as_symbol()])
+		
+		if self.streaming:
+			for a in self.__ground_actions():
+				yield from a.as_symbols()
+				for e in a.effects:
+					yield from e.as_symbols()
+			return
+		
+		for a in self.grounded_actions:
+			yield from a.as_symbols()
+		
+		for e in self.grounded_effects:
+			yield from e.as_symbols()
+	
+	def as_integer_symbols(self):
+		'''
+		Yields the facts of `as_symbols` with every name replaced by its integer in `self.symbols`.
+		This only makes the instance smaller as text, as clingo already interns strings.
+		'''
+		# Subterms are only remembered within a fact, but `self.symbols` keeps every name,
+		# so it grows with the number of actions and effects, even when streaming.
+		for symbol in self.as_symbols():
+			yield self.__encode_symbol(symbol, {})
+	
+	def __encode_symbol(self, symbol: Symbol, encoded: Dict[Symbol, Symbol]) -> Symbol:
+		'''
+		Replaces the strings in symbol with their integers, caching every subterm in encoded.
+		Uses an explicit stack, as goals may be nested deeper than the recursion limit.
+		'''
+		stack = [symbol]
+		while stack:
+			s = stack[-1]
+			if s in encoded:
+				stack.pop()
+				continue
+			
+			if s.type == SymbolType.String:
+				encoded[s] = Number(self.symbols.intern(s.string))
+			elif s.type == SymbolType.Function and s.arguments:
+				pending = [a for a in s.arguments if a not in encoded]
+				if pending:
+					stack.extend(pending)
+					continue
+				encoded[s] = Function(s.name, [encoded[a] for a in s.arguments], s.positive)
+			else:
+				encoded[s] = s
+			stack.pop()
+		return encoded[symbol]
 	
 	@staticmethod
 	def __get_predicates_in_formula(formula: lg.base.Formula) -> Set:
@@ -0,0 +1,86 @@
+import unittest
+import os
+import tempfile
+
+from spgt.benchmark import find_instances, csv_rows, run_isolated, CSV_FIELDS
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TEST_DATA = os.path.join(THIS_DIR, os.pardir, "benchmarks", "domains")
+
+class TestBenchmark(unittest.TestCase):
+	def test_a_find_instances(self):
+		with tempfile.TemporaryDirectory() as root:
+			for domain, problems in [("a", ["p01", "p02"]), ("b", ["p01"])]:
+				os.mkdir(os.path.join(root, domain))
+				for name in ["domain"] + problems:
+					open(os.path.join(root, domain, f"{name}.pddl"), "w").close()
+			# Directories without a domain are not benchmarks.
+			os.mkdir(os.path.join(root, "c"))
+			open(os.path.join(root, "c", "p01.pddl"), "w").close()
+			
+			pair = lambda d, p: (os.path.join(root, d, "domain.pddl"), os.path.join(root, d, f"{p}.pddl"))
+			subtests = [
+				([], [], [pair("a", "p01"), pair("a", "p02"), pair("b", "p01")]),
+				(["b"], [], [pair("b", "p01")]),
+				([], ["p02"], [pair("a", "p02")]),
+				(["b"], ["p02"], []),
+			]
+			
+			for domains, problems, expected in subtests:
+				with self.subTest(domains=domains, problems=problems):
+					self.assertEqual(find_instances(root, domains, problems), expected)
+		pass
+	
+	def test_b_csv_rows(self):
+		record = {
+			"domain": "acrobatics",
+			"problem": "p01",
+			"config": "",
+			"status": "solved",
+			"nodes": 2,
+			"total": 1.0,
+			"peak_rss_kb": 4096,
+			"children_peak_rss_kb": 2048,
+			"phases": {"parse": 0.1, "ground": 0.2},
+			"steps": [
+				{"nodes": 1, "ground": 0.01, "solve": 0.02, "result": "UNSAT"},
+				{"nodes": 2, "ground": 0.03, "solve": 0.04, "result": "SAT"},
+			],
+		}
+		rows = csv_rows(record)
+		self.assertEqual([(r["k"], r["clingo_ground"], r["clingo_solve"], r["result"]) for r in rows],
+						 [(1, 0.01, 0.02, "UNSAT"), (2, 0.03, 0.04, "SAT")])
+		for row in rows:
+			self.assertTrue(set(row) <= set(CSV_FIELDS))
+			self.assertEqual((row["domain"], row["nodes"], row["parse"], row["ground"]), ("acrobatics", 2, 0.1, 0.2))
+			self.assertEqual((row["peak_rss_kb"], row["children_peak_rss_kb"]), (4096, 2048))
+		
+		# Instances which never reached the solver still get a row.
+		rows = csv_rows({"domain": "acrobatics", "problem": "p01", "status": "timeout"})
+		self.assertEqual(len(rows), 1)
+		self.assertEqual((rows[0]["status"], rows[0]["k"]), ("timeout", None))
+		pass
+	
+	def test_c_run_isolated_exits(self):
+		'''
+		Tests a process exiting without a result is reported, rather than waited on forever.
+		'''
+		# argparse exits the process, rather than raising an Exception.
+		result = run_isolated(["--no_such_flag"])
+		self.assertEqual(result["status"], "error")
+		pass
+	
+	def test_d_run_isolated(self):
+		with tempfile.TemporaryDirectory() as temp_dir:
+			domain_path = os.path.join(TEST_DATA, "acrobatics", "domain.pddl")
+			problem_path = os.path.join(TEST_DATA, "acrobatics", "p01.pddl")
+			result = run_isolated([domain_path, problem_path, "-td", temp_dir], translate_only=True)
+		self.assertEqual(result["status"], "translated")
+		self.assertGreater(result["actions"], 0)
+		self.assertGreater(result["peak_rss_kb"], 0)
+		self.assertGreaterEqual(result["children_peak_rss_kb"], 0)
+		pass
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import os
+import tempfile
+
+from unittest import mock
+
+from spgt.cache import TranslationCache, CachedTranslation, translator_digest, _package_sources
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TEST_DATA = os.path.join(THIS_DIR, os.pardir, "benchmarks", "domains")
+
+class TestTranslationCache(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.domain_path = os.path.abspath(os.path.join(TEST_DATA, "acrobatics", "domain.pddl"))
+		self.instance_paths = [
+			os.path.abspath(os.path.join(TEST_DATA, "acrobatics", f"p0{i}.pddl")) for i in [1, 2]
+		]
+	
+	def tearDown(self):
+		self.tmp.cleanup()
+	
+	def test_a_key(self):
+		k = TranslationCache.key(self.domain_path, self.instance_paths[0])
+		self.assertEqual(k, TranslationCache.key(self.domain_path, self.instance_paths[0]))
+		self.assertNotEqual(k, TranslationCache.key(self.domain_path, self.instance_paths[1]))
+		self.assertNotEqual(k, TranslationCache.key(self.domain_path, self.instance_paths[0], "(up()=trueValue)"))
+		self.assertNotEqual(k, TranslationCache.key(self.domain_path, self.instance_paths[0], integer_ids=True))
+		
+		# Changing the translator, without changing the version, invalidates every entry.
+		self.assertTrue({"translator.py", os.path.join("asp", "symbols.py"), os.path.join("base", "logic.py")} <= set(_package_sources()))
+		translator_digest.cache_clear()
+		with mock.patch("spgt.cache._package_sources", lambda: ["translator.py"]):
+			self.assertNotEqual(k, TranslationCache.key(self.domain_path, self.instance_paths[0]))
+		translator_digest.cache_clear()
+		self.assertEqual(k, TranslationCache.key(self.domain_path, self.instance_paths[0]))
+		pass
+	
+	def test_b_round_trip(self):
+		cache = TranslationCache(self.tmp.name)
+		entry = CachedTranslation('action("a").\n', True)
+		self.assertIsNone(cache.get("abc"))
+		cache.put("abc", entry)
+		found = cache.get("abc")
+		self.assertEqual(found.instance, entry.instance)
+		self.assertEqual(found.ppltl, entry.ppltl)
+		self.assertIsNone(found.names)
+		
+		cache.put("def", CachedTranslation('action(0).\n', False, ["a"]))
+		self.assertEqual(cache.get("def").names, ["a"])
+		
+		# An entry evicted between being read and being marked as used is still returned.
+		with mock.patch("os.utime", side_effect=FileNotFoundError):
+			self.assertEqual(cache.get("def").names, ["a"])
+		pass
+	
+	def test_c_eviction(self):
+		cache = TranslationCache(self.tmp.name)
+		for i, key in enumerate(["a", "b", "c"]):
+			cache.put(key, CachedTranslation("x" * 100, False))
+			# Entries are ordered by when they were last used.
+			os.utime(os.path.join(self.tmp.name, key + ".json"), (i, i))
+		
+		# Each entry is a bit over 100 bytes, so only two fit.
+		cache.max_bytes = 300
+		cache.evict()
+		self.assertIsNone(cache.get("a"))
+		self.assertIsNotNone(cache.get("b"))
+		self.assertIsNotNone(cache.get("c"))
+		pass
+
+if __name__ == "__main__":
+	unittest.main()
@@ -1,7 +1,8 @@
+import pickle
 import unittest
 
 from spgt.asp.symbols import *
-from spgt.base.domain import GroundedAction, GroundedEffect
+from spgt.base.domain import GroundedAction, GroundedEffect, SymbolTable
 from spgt.base.logic import Formula, Verum, Falsum, Atom, Neg, Conj, Disj, Assign
 
 class TestEffectBasic(unittest.TestCase):
@@ -78,6 +79,62 @@ class TestEffectBasic(unittest.TestCase):
 				rules_set = set(e.as_ASP())
 				self.assertSetEqual(rules_set, set(expected))	
 		pass
+	
+	def test_d_effect_immutable(self):
+		"""
+		Tests effects cannot be changed, and hash and compare by their contents.
+		"""
+		form = Conj(Assign(Atom('a'), Atom('b')), Neg(Assign(Atom('e'), Atom('f'))))
+		e = GroundedEffect.from_formula("x", form)
+		
+		with self.assertRaises(AttributeError):
+			e.name = "y"
+		with self.assertRaises(AttributeError):
+			e.__dict__
+		
+		self.assertEqual(e, GroundedEffect.from_formula("x", form))
+		self.assertEqual(hash(e), hash(GroundedEffect.from_formula("x", form)))
+		self.assertNotEqual(e, GroundedEffect.from_formula("y", form))
+		self.assertEqual(len({e, GroundedEffect.from_formula("x", form)}), 1)
+		
+		copy = pickle.loads(pickle.dumps(e))
+		self.assertEqual(copy, e)
+		pass
+
+class TestActionBasic(unittest.TestCase):
+	def test_a_action_immutable(self):
+		"""
+		Tests actions cannot be changed, only copied with a new precondition.
+		"""
+		e = GroundedEffect("x_effect_0", [(Atom('a'), Atom('b'))], [])
+		a = GroundedAction("x", Atom('c'), [e])
+		
+		with self.assertRaises(AttributeError):
+			a.precondition = Verum()
+		
+		b = a.with_precondition(Verum())
+		self.assertIs(b.precondition, Verum())
+		self.assertIs(a.precondition, Atom('c'))
+		self.assertNotEqual(a, b)
+		self.assertEqual(a, GroundedAction("x", Atom('c'), [e]))
+		self.assertEqual(pickle.loads(pickle.dumps(a)), a)
+		pass
+
+class TestSymbolTable(unittest.TestCase):
+	def test_a_intern(self):
+		"""
+		Tests names are given consecutive integers, once each.
+		"""
+		table = SymbolTable()
+		names = ["position", "p0", "walk_p0_p1", "p0", "position"]
+		ids = [table.intern(n) for n in names]
+		
+		self.assertListEqual(ids, [0, 1, 2, 1, 0])
+		self.assertEqual(len(table), 3)
+		for name, i in zip(names, ids):
+			with self.subTest(name=name):
+				self.assertEqual(table.name(i), name)
+		pass
 
 if __name__ == "__main__":
 	unittest.main()
\ No newline at end of file
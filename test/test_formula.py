@@ -1,5 +1,6 @@
 from spgt.base.logic import Formula, Falsum, Verum, Atom, Assign, Neg, Disj, Conj
 import unittest
+import pickle
 
 class TestFormulaBasic(unittest.TestCase):
 	"""
@@ -201,5 +202,48 @@ class TestFormulaVariables(unittest.TestCase):
 		"""
 		pass
 
+class TestFormulaInterning(unittest.TestCase):
+	def test_a_shared_nodes(self):
+		"""
+		Tests structurally equal formulae are the same object.
+		"""
+		subtests = [
+			(lambda: Atom('a'), lambda: Formula.parse("a")),
+			(lambda: Conj(Atom('a'), Neg(Atom('b'))), lambda: Formula.parse("a&!b")),
+			(lambda: Verum(), lambda: Verum()),
+			(lambda: Disj(Assign(Atom("baguette"), Atom("dry")), Atom('c')), lambda: Formula.parse("(baguette=dry)|c")),
+			(lambda: Atom(name='a'), lambda: Atom('a')),
+			(lambda: Neg(child=Atom(name='a')), lambda: Formula.parse("!a")),
+		]
+		
+		for first, second in subtests:
+			with self.subTest(formula=str(first())):
+				# Nodes only live while referenced, so keep both alive.
+				a, b = first(), second()
+				self.assertIs(a, b)
+				self.assertEqual(hash(a), hash(b))
+		
+		with self.subTest(case="different"):
+			self.assertIsNot(Conj(Atom('a'), Atom('b')), Conj(Atom('b'), Atom('a')))
+			self.assertIsNot(Conj(Atom('a'), Atom('b')), Disj(Atom('a'), Atom('b')))
+			# PDDL names are case-insensitive, but ASP symbols are not.
+			self.assertIsNot(Atom('A'), Atom('a'))
+		
+		with self.subTest(case="unknown keyword"):
+			with self.assertRaises(TypeError):
+				Atom(label='a')
+		pass
+	
+	def test_b_memoised(self):
+		"""
+		Tests transformations of a formula are computed once, and survive pickling.
+		"""
+		form = Formula.parse("!((h&f)|(d&c))")
+		self.assertIs(Formula.NNF(form), Formula.NNF(Formula.parse("!((h&f)|(d&c))")))
+		self.assertIs(Formula.simplify_constants(form), Formula.simplify_constants(form))
+		self.assertIs(form.as_ASP(), form.as_ASP())
+		self.assertIs(pickle.loads(pickle.dumps(form)), form)
+		pass
+
 if __name__ == "__main__":
 	unittest.main()
\ No newline at end of file
@@ -157,6 +157,101 @@ class TestFormulaBasic(unittest.TestCase):
 		# 		self.assertEqual(str(organised), exp_org)
 			
 		pass
+	
+	def test_h_deep(self):
+		"""
+		Tests formulae nested far deeper than the recursion limit can be transformed.
+		"""
+		depth = 5000
+		form = Neg(Conj(Atom('a'), Verum()))
+		for _ in range(depth):
+			form = Neg(Yesterday(form))
+		
+		# An even number of negations is pushed through every Yesterday.
+		nnf = Formula.simplify_constants(Formula.NNF(form))
+		for _ in range(depth):
+			self.assertIsInstance(nnf, Yesterday)
+			nnf = nnf._arg
+		self.assertEqual(str(nnf), "¬a")
+		
+		self.assertTrue(form.is_ppltl())
+		self.assertEqual(Formula.NNF(form).as_ASP().count("yest("), depth)
+		self.assertEqual(str(Formula.NNF(form).as_symbol()).count("yest("), depth)
+		pass
+
+class TestFormulaParser(unittest.TestCase):
+	def test_a_precedence(self):
+		"""
+		Tests operators bind in order of precedence, and group to the right.
+		"""
+		subtests = [
+			("a&b&c", "(a∧(b∧c))"),
+			("a&b|c", "((a∧b)∨c)"),
+			("a|b&c", "(a∨(b∧c))"),
+			("aSb&c", "((aSb)∧c)"),
+			("!aSb", "(¬aSb)"),
+			("Ya&b", "(Ya∧b)"),
+			("!v=x", "¬(v=x)"),
+			("v=x&up()=trueValue", "((v=x)∧(up()=trueValue))"),
+			("at(p1) = p2 | YB", "((at(p1)=p2)∨YB)"),
+		]
+		
+		for original, exp_output in subtests:
+			with self.subTest(original=original, exp_output=exp_output):
+				self.assertEqual(str(Formula.parse(original)), exp_output)
+		pass
+	
+	def test_b_deep(self):
+		"""
+		Tests deeply nested formulae are not limited by the recursion limit.
+		"""
+		depth = 5000
+		form = Formula.parse("Y(" * depth + "a" + ")" * depth)
+		for _ in range(depth):
+			self.assertIsInstance(form, Yesterday)
+			form = form._arg
+		self.assertEqual(form, Atom("a"))
+		pass
+	
+	def test_c_errors(self):
+		"""
+		Tests syntax errors give their position.
+		"""
+		subtests = [
+			("a&", 2),
+			("a&|b", 2),
+			("(a&b", 0),
+			("a&b)", 3),
+			("a b", 2),
+			("up(", 2),
+		]
+		
+		for original, position in subtests:
+			with self.subTest(original=original, position=position):
+				with self.assertRaisesRegex(ValueError, f"at position {position}:"):
+					Formula.parse(original)
+		pass
+	
+	def test_d_unbracketed_goals(self):
+		"""
+		Tests the goals whose meaning changed with precedence, which were read by
+		splitting at the leftmost operator, and must now be bracketed to keep that meaning.
+		"""
+		subtests = [
+			("a&b|c", "((a∧b)∨c)", "a&(b|c)", "(a∧(b∨c))"),
+			("aSb&c", "((aSb)∧c)", "aS(b&c)", "(aS(b∧c))"),
+			("!a&b", "(¬a∧b)", "!(a&b)", "¬(a∧b)"),
+			("Ya&b", "(Ya∧b)", "Y(a&b)", "Y(a∧b)"),
+			("(p=p0)S(p=p1)&(up()=trueValue)", "(((p=p0)S(p=p1))∧(up()=trueValue))",
+			 "(p=p0)S((p=p1)&(up()=trueValue))", "((p=p0)S((p=p1)∧(up()=trueValue)))"),
+		]
+		
+		for original, now, bracketed, before in subtests:
+			with self.subTest(original=original):
+				self.assertEqual(str(Formula.parse(original)), now)
+				self.assertEqual(str(Formula.parse(bracketed)), before)
+				self.assertNotEqual(Formula.parse(original), Formula.parse(bracketed))
+		pass
 
 class TestFormulaVariables(unittest.TestCase):
 	def test_a_str(self):
@@ -0,0 +1,26 @@
+import unittest
+import subprocess
+import sys
+
+# Only needed to translate instances or draw graphs.
+SLOW_MODULES = ["pddl", "fondutils", "clingraph", "spgt.translator"]
+
+class TestLazyImports(unittest.TestCase):
+	def test_a_main(self):
+		"""
+		Tests the CLI does not import slow dependencies until they are used.
+		"""
+		proc = subprocess.run(
+			[sys.executable, "-c", "import sys, spgt.__main__; print(' '.join(sys.modules))"],
+			stdout=subprocess.PIPE,
+			text=True,
+			check=True
+		)
+		imported = set(proc.stdout.split())
+		for module in SLOW_MODULES:
+			with self.subTest(module=module):
+				self.assertNotIn(module, imported)
+		pass
+
+if __name__ == "__main__":
+	unittest.main()
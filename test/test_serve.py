@@ -0,0 +1,74 @@
+import unittest
+import json
+import os
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+
+from spgt.serve import SolverServer, request_argv
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TEST_DATA = os.path.join(THIS_DIR, os.pardir, "benchmarks", "domains")
+
+class TestServe(unittest.TestCase):
+	def __post(self, url, body):
+		return urllib.request.Request(url, json.dumps(body).encode(), {"Content-Type": "application/json"})
+	
+	def test_a_request_argv(self):
+		argv = request_argv({"domain": "d.pddl", "problem": "p.pddl", "flags": ["--strong"], "goal": "(up()=trueValue)"}, "tmp", "cache")
+		self.assertEqual(argv, ["d.pddl", "p.pddl", "-td", "tmp", "--cache_dir", "cache", "--strong", "--goal=(up()=trueValue)"])
+		self.assertEqual(request_argv({"domain": "d.pddl", "problem": "p.pddl", "flags": ["--jobs", "3", "--time_limit=-1"]}, "tmp")[4:],
+						 ["--jobs", "3", "--time_limit=-1"])
+		self.assertEqual(request_argv({"domain": "d.pddl", "problem": "p.pddl"}, "tmp"), ["d.pddl", "p.pddl", "-td", "tmp"])
+		
+		for request in [[], {"domain": "d.pddl"}, {"domain": "d.pddl", "problem": 1},
+						{"domain": "d.pddl", "problem": "p.pddl", "flags": "--strong"},
+						{"domain": "d.pddl", "problem": "p.pddl", "flags": ["--stats_json", "/tmp/x.json"]},
+						{"domain": "d.pddl", "problem": "p.pddl", "flags": ["--stats", "/tmp/x.json"]},
+						{"domain": "d.pddl", "problem": "p.pddl", "flags": ["-td=/tmp"]},
+						{"domain": "d.pddl", "problem": "p.pddl", "flags": ["--cache_dir", "/tmp"]},
+						{"domain": "d.pddl", "problem": "p.pddl", "flags": ["--subprocess", "--clingo_path", "/bin/sh"]},
+						{"domain": "d.pddl", "problem": "p.pddl", "flags": ["--clingo_args=--help"]}]:
+			with self.subTest(request=request):
+				with self.assertRaises(ValueError):
+					request_argv(request, "tmp")
+		pass
+	
+	def test_b_solve(self):
+		with tempfile.TemporaryDirectory() as cache_dir:
+			server = SolverServer(port=0, workers=1, cache_dir=cache_dir)
+			thread = threading.Thread(target=server.serve_forever)
+			thread.start()
+			url = f"http://127.0.0.1:{server.server_address[1]}"
+			try:
+				request = {
+					"domain": os.path.abspath(os.path.join(TEST_DATA, "acrobatics", "domain.pddl")),
+					"problem": os.path.abspath(os.path.join(TEST_DATA, "acrobatics", "p01.pddl")),
+				}
+				# The second request reuses the first's domain and translation.
+				for i in range(2):
+					with self.subTest(request=i):
+						with urllib.request.urlopen(self.__post(f"{url}/solve", request)) as response:
+							result = json.load(response)
+						self.assertTrue(result["solved"])
+						self.assertEqual(result["nodes"], len(result["controller"]["node"]))
+				
+				with self.assertRaises(urllib.error.HTTPError) as e:
+					urllib.request.urlopen(self.__post(f"{url}/solve", {"domain": "d.pddl", "problem": "p.pddl"}))
+				self.assertEqual(e.exception.code, 400)
+				e.exception.close()
+				
+				# Browsers send text/plain across origins without asking first.
+				plain = urllib.request.Request(f"{url}/solve", json.dumps(request).encode(), {"Content-Type": "text/plain"})
+				with self.assertRaises(urllib.error.HTTPError) as e:
+					urllib.request.urlopen(plain)
+				self.assertEqual(e.exception.code, 415)
+				e.exception.close()
+			finally:
+				server.shutdown()
+				thread.join()
+				server.server_close()
+			self.assertFalse(os.path.exists(server.work_dir))
+		pass
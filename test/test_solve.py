@@ -0,0 +1,237 @@
+import unittest
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from time import time
+from unittest import mock
+
+from spgt.__main__ import get_args, parse_clingo_args, solve_problem, emit_instance
+from spgt.batch import solve_batch
+from spgt.solver import parse_controller, solve, solve_parallel_subprocess
+from spgt.translator import Translator
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TEST_DATA = os.path.join(THIS_DIR, os.pardir, "benchmarks", "domains")
+
+def acrobatics_args(problem: str, temp_dir: str, *flags: str):
+	domain_path = os.path.join(TEST_DATA, "acrobatics", "domain.pddl")
+	problem_path = os.path.join(TEST_DATA, "acrobatics", f"{problem}.pddl")
+	args = get_args(argv=[domain_path, problem_path, "-td", temp_dir] + list(flags))
+	args.clingo_args = parse_clingo_args(args.clingo_args)
+	return args
+
+def solve_acrobatics(problem: str, temp_dir: str, *flags: str):
+	'''
+	Solves an acrobatics problem with the given spgt flags, returning the number of nodes
+	in its controller, or None if there is none.
+	'''
+	args = acrobatics_args(problem, temp_dir, *flags)
+	with contextlib.redirect_stdout(io.StringIO()):
+		output = solve_problem(args)
+	return len(parse_controller(output)["node"]) if output else None
+
+class TestIncremental(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+	
+	def tearDown(self):
+		self.tmp.cleanup()
+	
+	def test_a_same_size(self):
+		'''
+		Tests incremental solving finds controllers the same size as solving each size from scratch.
+		'''
+		subtests = [
+			("p01", [], 4),
+			("p02", [], 8),
+			("p02", ["--strong", "--goal=(up()=trueValue)"], 2),
+			("p02", ["--ppltl", "--strong", "--goal=(up()=trueValue)"], 2),
+			("p03", ["--ppltl", "--goal=(Y(Y(Y(Y(Y(position=p0)))))&((position=p0)S(position=p1)))&(up() = trueValue)"], 6),
+		]
+		
+		for problem, flags, nodes in subtests:
+			with self.subTest(problem=problem, flags=flags):
+				self.assertEqual(solve_acrobatics(problem, self.tmp.name, *flags), nodes)
+				self.assertEqual(solve_acrobatics(problem, self.tmp.name, "--incremental", *flags), nodes)
+		pass
+
+class TestInstanceInput(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+	
+	def tearDown(self):
+		self.tmp.cleanup()
+	
+	def test_a_same_model(self):
+		'''
+		Tests instances handed to clingo in memory give the same model as reading them from a file.
+		'''
+		args = acrobatics_args("p02", self.tmp.name)
+		t = Translator(args.domain, args.problem)
+		t.ground()
+		instance_path = os.path.join(self.tmp.name, "instance.lp")
+		with open(instance_path, "w") as f:
+			f.write(emit_instance(args, t))
+		
+		subtests = [[], ["--symbols"]]
+		if shutil.which("clingo"):
+			subtests.append(["--subprocess"])
+		
+		for flags in subtests:
+			with self.subTest(flags=flags):
+				with contextlib.redirect_stdout(io.StringIO()):
+					args = acrobatics_args("p02", self.tmp.name, *flags)
+					from_file = solve(args, None, time(), instance_file=instance_path)
+					args = acrobatics_args("p02", self.tmp.name, *flags)
+					in_memory = solve(args, emit_instance(args, t), time())
+				self.assertEqual(len(parse_controller(in_memory)["node"]), 8)
+				self.assertListEqual(sorted(in_memory), sorted(from_file))
+		pass
+
+class TestStats(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+	
+	def tearDown(self):
+		self.tmp.cleanup()
+	
+	def test_a_schema(self):
+		'''
+		Tests the --stats_json report has a timing for each phase, and a step for each size tried.
+		'''
+		stats_path = os.path.join(self.tmp.name, "stats.json")
+		for flags in [[], ["--incremental"]]:
+			with self.subTest(flags=flags):
+				self.assertEqual(solve_acrobatics("p01", self.tmp.name, "--stats_json", stats_path, *flags), 4)
+				with open(stats_path) as f:
+					report = json.load(f)
+				
+				self.assertTrue(report["solved"])
+				self.assertIsNone(report["goal"])
+				self.assertEqual(report["problem"], os.path.abspath(os.path.join(TEST_DATA, "acrobatics", "p01.pddl")))
+				self.assertGreater(report["total"], 0)
+				self.assertEqual(set(report["phases"]), {"translator", "ground", "emit", "solve"})
+				for phase, seconds in report["phases"].items():
+					self.assertGreaterEqual(seconds, 0, phase)
+				
+				steps = report["steps"]
+				self.assertListEqual([step["nodes"] for step in steps], [1, 2, 3, 4])
+				self.assertListEqual([step["result"] for step in steps], ["UNSAT"] * 3 + ["SAT"])
+				for step in steps:
+					self.assertGreaterEqual(step["ground"], 0)
+					self.assertGreaterEqual(step["solve"], 0)
+					self.assertTrue({"atoms", "rules", "choices", "conflicts", "restarts", "total_time"} <= set(step["clingo"]))
+		pass
+
+class TestBatch(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+	
+	def tearDown(self):
+		self.tmp.cleanup()
+	
+	def test_a_stats(self):
+		'''
+		Tests every problem of a batch writes its own --stats_json report.
+		'''
+		domain_path = os.path.join(TEST_DATA, "acrobatics", "domain.pddl")
+		problems = [os.path.join(TEST_DATA, "acrobatics", f"{p}.pddl") for p in ["p01", "p02"]]
+		stats_path = os.path.join(self.tmp.name, "stats.json")
+		args = get_args(batch=True, argv=[domain_path] + problems + ["-td", self.tmp.name, "--workers", "2", "--stats_json", stats_path])
+		args.clingo_args = parse_clingo_args(args.clingo_args)
+		with contextlib.redirect_stdout(io.StringIO()):
+			solve_batch(args)
+		
+		self.assertFalse(os.path.exists(stats_path))
+		for problem, path, nodes in zip(problems, ["stats_p01.json", "stats_p02.json"], [4, 8]):
+			with self.subTest(report=path):
+				with open(os.path.join(self.tmp.name, path)) as f:
+					report = json.load(f)
+				self.assertEqual(report["problem"], os.path.abspath(problem))
+				self.assertEqual(report["steps"][-1]["nodes"], nodes)
+		pass
+
+class FakeSubprocess:
+	'''
+	Stands in for a clingo subprocess, answering with `outputs[k]`.
+	Larger sizes answer first, as a smaller size must still be waited on if a larger one fails.
+	'''
+	outputs = {}
+	
+	def __init__(self, clingo_path, files, k, extra_args, instance):
+		self.k = k
+		self.cancelled = threading.Event()
+	
+	def result(self):
+		if self.cancelled.wait(0.1 * (10 - self.k)):
+			return None
+		return self.outputs.get(self.k, False)
+	
+	def cancel(self):
+		self.cancelled.set()
+
+class TestParallelErrors(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+	
+	def tearDown(self):
+		self.tmp.cleanup()
+	
+	def test_a_failed_size(self):
+		'''
+		Tests a size failing only gives up once every smaller size is shown to have no controller.
+		'''
+		subtests = [
+			({2: ["a"], 3: None}, ["a"]),
+			({2: None, 3: ["a"]}, []),
+			({1: None, 2: ["a"]}, []),
+			({3: None, 4: None, 5: ["a"]}, []),
+		]
+		
+		for outputs, expected in subtests:
+			with self.subTest(outputs=outputs):
+				args = acrobatics_args("p01", self.tmp.name, "--jobs", "3")
+				with mock.patch("spgt.solver.ClingoSubprocess", FakeSubprocess), \
+						mock.patch.object(FakeSubprocess, "outputs", outputs), \
+						contextlib.redirect_stdout(io.StringIO()):
+					self.assertEqual(solve_parallel_subprocess(args, [], time()), expected)
+		pass
+
+@unittest.skipUnless(shutil.which("clingo"), "clingo is not on the PATH.")
+class TestParallel(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+	
+	def tearDown(self):
+		self.tmp.cleanup()
+	
+	def test_a_same_size(self):
+		'''
+		Tests solving several sizes at once still finds the smallest controller.
+		'''
+		stats_path = os.path.join(self.tmp.name, "stats.json")
+		for problem in ["p01", "p02"]:
+			with self.subTest(problem=problem):
+				sequential = solve_acrobatics(problem, self.tmp.name)
+				self.assertEqual(solve_acrobatics(problem, self.tmp.name, "--jobs", "3", "--stats_json", stats_path), sequential)
+				
+				with open(stats_path) as f:
+					steps = json.load(f)["steps"]
+				# Every size below the controller's was shown to have no controller.
+				results = dict((step["nodes"], step["result"]) for step in steps)
+				self.assertEqual(results[sequential], "SAT")
+				for k in range(1, sequential):
+					self.assertEqual(results[k], "UNSAT")
+				for step in steps:
+					self.assertIsNone(step["ground"])
+					self.assertGreater(step["solve"], 0)
+		pass
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,268 @@
+import argparse
+import csv
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from time import time
+from clingo import Control
+
+from spgt.solver import _linear_search, _gallop_search, decode_model, _read_json_output, ClingoSubprocess, \
+		parse_controller, select_files, _solve_until, _race_portfolio, _record_portfolio_winners
+from spgt.names import ASP_SHOW_CONTROLLER_PATH, ASP_SHOW_GRAPH_PATH
+
+def attempt_from(minimum: int, tried: list):
+	'''
+	Returns an attempt function which is satisfiable from `minimum` nodes onwards,
+	recording every size it is given in `tried`.
+	'''
+	def attempt(k):
+		tried.append(k)
+		if k >= minimum:
+			return [f"node({k})"]
+		return False
+	return attempt
+
+class TestSizeSearch(unittest.TestCase):
+	def test_a_linear(self):
+		for start, minimum in [(1, 1), (1, 6), (3, 17)]:
+			with self.subTest(start=start, minimum=minimum):
+				tried = []
+				k, output = _linear_search(start, attempt_from(minimum, tried))
+				self.assertEqual(k, minimum)
+				self.assertEqual(output, [f"node({minimum})"])
+				self.assertEqual(tried, list(range(start, minimum+1)))
+		pass
+	
+	def test_b_gallop(self):
+		for start, minimum in [(1, 1), (1, 2), (1, 6), (1, 23), (4, 4), (4, 30)]:
+			with self.subTest(start=start, minimum=minimum):
+				tried = []
+				k, output = _gallop_search(start, attempt_from(minimum, tried))
+				self.assertEqual(k, minimum)
+				self.assertEqual(output, [f"node({minimum})"])
+				self.assertEqual(len(tried), len(set(tried)))
+		pass
+	
+	def test_c_gallop_first_sat(self):
+		tried = []
+		k, output = _gallop_search(1, attempt_from(6, tried), first_sat=True)
+		self.assertEqual(tried, [1, 2, 4, 8])
+		self.assertEqual(k, 8)
+		self.assertEqual(output, ["node(8)"])
+		pass
+	
+	def test_d_gallop_error(self):
+		k, output = _gallop_search(1, lambda k: None if k > 3 else False)
+		self.assertIsNone(output)
+		pass
+	
+	def test_e_gallop_out_of_time(self):
+		"""
+		Tests the smallest controller found is kept if time runs out while minimising.
+		"""
+		tried = []
+		satisfiable = attempt_from(6, tried)
+		def attempt(k):
+			return None if len(tried) >= 5 else satisfiable(k)
+		
+		k, output = _gallop_search(1, attempt)
+		self.assertEqual(tried, [1, 2, 4, 8, 6])
+		self.assertEqual(k, 6)
+		self.assertEqual(output, ["node(6)"])
+		pass
+
+class TestDecodeModel(unittest.TestCase):
+	def test_a_decode(self):
+		"""
+		Tests only the actions and effects of the controller are named again.
+		"""
+		names = ["climb_p0", "climb_p0_effect_0", "position", "p0"]
+		subtests = [
+			("policy(0,0)", 'policy(0,"climb_p0")'),
+			("next(0,1,1)", 'next(0,"climb_p0_effect_0",1)'),
+			("attr(node,0,(label,action),0)", 'attr(node,0,(label,action),"climb_p0")'),
+			("attr(edge,(0,1),label,1)", 'attr(edge,(0,1),label,"climb_p0_effect_0")'),
+			("attr(node,0,(label,node),0)", "attr(node,0,(label,node),0)"),
+			('attr(node,1,label,"<Node {{node}}: Final.>")', 'attr(node,1,label,"<Node {{node}}: Final.>")'),
+			("holds(0,has_value(2,3))", "holds(0,has_value(2,3))"),
+			("SATISFIABLE", "SATISFIABLE"),
+		]
+		
+		for atom, expected in subtests:
+			with self.subTest(atom=atom):
+				self.assertEqual(decode_model([atom], names), [expected])
+		pass
+
+# Pigeonhole problems are very hard to show unsatisfiable.
+PIGEONHOLE = """
+pigeon(1..13). hole(1..12).
+{in(P, H): hole(H)} = 1 :- pigeon(P).
+:- in(P1, H), in(P2, H), P1 < P2.
+"""
+
+class TestTimeLimit(unittest.TestCase):
+	def solve(self, program: str, deadline: float | None = None):
+		ctl = Control()
+		ctl.add("base", [], program)
+		ctl.ground()
+		return _solve_until(ctl, deadline)
+	
+	def test_a_solve_until(self):
+		with self.subTest(result="SAT"):
+			self.assertListEqual(self.solve("p. q :- p.", time() + 10), ["p", "q"])
+		
+		with self.subTest(result="UNSAT"):
+			self.assertFalse(self.solve("p. :- p.", time() + 10))
+		
+		with self.subTest(result="out of time"):
+			start = time()
+			self.assertIsNone(self.solve(PIGEONHOLE, start + 0.5))
+			self.assertLess(time() - start, 5)
+		pass
+
+class TestProjection(unittest.TestCase):
+	def test_a_parse_controller(self):
+		model = ['next(1,"e1",0)', 'policy(1,"b")', "node(1)", 'next(0,"e0",1)', "node(0)", 'policy(0,"a")',
+			"edge((0,1))", "holds(0,verum)", 'attr(node,0,(label,action),"a")']
+		self.assertDictEqual(parse_controller(model), {
+			"node": [(0,), (1,)],
+			"policy": [(0, "a"), (1, "b")],
+			"next": [(0, "e0", 1), (1, "e1", 0)],
+		})
+		pass
+	
+	def test_b_show_files(self):
+		"""
+		Tests the model is only projected without --full_model, and graph atoms only kept for graphs.
+		"""
+		for incremental in [False, True]:
+			for graph in [False, True]:
+				for full_model in [False, True]:
+					with self.subTest(incremental=incremental, graph=graph, full_model=full_model):
+						args = argparse.Namespace(incremental=incremental, graph=graph, full_model=full_model, ppltl=False, strong=False)
+						files = select_files(args)
+						self.assertEqual(ASP_SHOW_CONTROLLER_PATH in files, not full_model)
+						self.assertEqual(ASP_SHOW_GRAPH_PATH in files, graph and not full_model)
+		pass
+
+class SlowStream(io.StringIO):
+	'''
+	Returns at most `size` characters per read, to split the output at awkward places.
+	'''
+	def __init__(self, text: str, size: int):
+		super().__init__(text)
+		self.size = size
+	
+	def read(self, n: int = -1):
+		return super().read(self.size)
+
+TWO_MODELS = """{
+  "Solver": "clingo version 5.8.0",
+  "Call": [
+    {
+      "Witnesses": [
+        {
+          "Value": [
+            "policy(0,\\"a\\")", "holds(0,has_value(\\"up()\\",\\"trueValue\\"))"
+          ]
+        },
+        {
+          "Value": [
+            "node(0)", "next(0,\\"a, ]\\",0)"
+          ]
+        }
+      ]
+    }
+  ],
+  "Result": "SATISFIABLE",
+  "Models": {
+    "Number": 2
+  }
+}
+"""
+
+UNSAT = """{
+  "Call": [
+    {
+      "Start": 0.000,
+      "Stop": 0.001
+    }
+  ],
+  "Result": "UNSATISFIABLE"
+}
+"""
+
+class TestJSONOutput(unittest.TestCase):
+	def test_a_read(self):
+		"""
+		Tests the last model is read however the output is split.
+		"""
+		for size in [1, 2, 7, 2**16]:
+			with self.subTest(size=size):
+				self.assertEqual(_read_json_output(SlowStream(TWO_MODELS, size)),
+					("SATISFIABLE", ["node(0)", 'next(0,"a, ]",0)']))
+				self.assertEqual(_read_json_output(SlowStream(UNSAT, size)), ("UNSATISFIABLE", None))
+				self.assertEqual(_read_json_output(SlowStream(UNSAT[:20], size)), (None, None))
+		pass
+	
+	@unittest.skipUnless(shutil.which("clingo"), "clingo is not on the PATH.")
+	def test_b_subprocess(self):
+		"""
+		Tests clingo subprocesses report their models, and can be cancelled.
+		"""
+		with self.subTest(result="SAT"):
+			proc = ClingoSubprocess("clingo", ["-"], instance='p("x"). q :- p(_).')
+			self.assertListEqual(sorted(proc.result()), ['p("x")', 'q'])
+		
+		with self.subTest(result="UNSAT"):
+			proc = ClingoSubprocess("clingo", ["-"], instance="p. :- p.")
+			self.assertFalse(proc.result())
+		
+		with self.subTest(result="cancelled"):
+			# Too many models to ever finish enumerating.
+			proc = ClingoSubprocess("clingo", ["-"], extra_args=["0"], instance="{p(1..100)}.")
+			threading.Timer(0.5, proc.cancel).start()
+			self.assertIsNone(proc.result())
+		pass
+
+class TestPortfolio(unittest.TestCase):
+	@unittest.skipUnless(shutil.which("clingo"), "clingo is not on the PATH.")
+	def test_a_race(self):
+		"""
+		Tests the first configuration to answer wins, and the rest are stopped.
+		"""
+		# Enumerating every model never finishes, so slow can only lose.
+		portfolio = [("slow", ["0"]), ("fast", [])]
+		start = time()
+		winner, output = _race_portfolio("clingo", ["-"], portfolio=portfolio, instance="{p(1..100)}.")
+		self.assertEqual(winner, "fast")
+		self.assertIsInstance(output, list)
+		self.assertLess(time() - start, 5)
+		
+		with self.subTest(result="every configuration failed"):
+			winner, output = _race_portfolio("clingo", ["-"], portfolio=portfolio, instance="p(")
+			self.assertIsNone(winner)
+			self.assertIsNone(output)
+		pass
+	
+	def test_b_record_winners(self):
+		with tempfile.TemporaryDirectory() as temp_dir:
+			args = argparse.Namespace(temp_dir=temp_dir, domain='a,"b"/domain.pddl', problem="p01.pddl")
+			_record_portfolio_winners(args, [(1, "tweety", False), (2, "trendy", ["node(0)"])])
+			_record_portfolio_winners(args, [(3, "frumpy", ["node(0)"])])
+			with open(os.path.join(temp_dir, "portfolio.csv"), newline="") as f:
+				rows = list(csv.reader(f))
+		self.assertListEqual(rows, [
+			["domain", "problem", "nodes", "configuration", "result"],
+			['a,"b"/domain.pddl', "p01.pddl", "1", "tweety", "UNSAT"],
+			['a,"b"/domain.pddl', "p01.pddl", "2", "trendy", "SAT"],
+			['a,"b"/domain.pddl', "p01.pddl", "3", "frumpy", "SAT"],
+		])
+		pass
+
+if __name__ == "__main__":
+	unittest.main()
@@ -1,10 +1,114 @@
 import unittest
 import os
+import tempfile
 from spgt.translator import Translator
+from spgt.base.logic import Formula, Falsum
 import pddl
+from clingo import parse_term, Function, String, SymbolType
 
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# The vault can only be entered with a key, and the key is only in the vault.
+VAULT_DOMAIN = """(define (domain vault)
+	(:requirements :typing :strips :non-deterministic)
+	(:types room)
+	(:predicates (at ?r - room) (door ?r1 ?r2 - room) (has-key) (vault ?r - room))
+	(:action walk
+		:parameters (?from ?to - room)
+		:precondition (and (at ?from) (door ?from ?to) (not (vault ?to)))
+		:effect (and (at ?to) (not (at ?from))))
+	(:action unlock
+		:parameters (?from ?to - room)
+		:precondition (and (at ?from) (door ?from ?to) (vault ?to) (has-key))
+		:effect (and (at ?to) (not (at ?from))))
+	(:action take-key
+		:parameters (?r - room)
+		:precondition (and (at ?r) (vault ?r))
+		:effect (has-key)))
+"""
+
+VAULT_PROBLEM = """(define (problem vault-1)
+	(:domain vault)
+	(:objects hall kitchen safe - room)
+	(:init (at hall) (door hall kitchen) (door kitchen hall) (door kitchen safe) (vault safe))
+	(:goal (at kitchen)))
+"""
+
+# Vehicles are split into subtypes, and only some objects are vehicles.
+FLEET_DOMAIN = """(define (domain fleet)
+	(:requirements :typing :strips)
+	(:types vehicle place - object car truck - vehicle)
+	(:predicates (parked ?v - vehicle ?p - place))
+	(:action drive
+		:parameters (?v - vehicle ?from ?to - place)
+		:precondition (parked ?v ?from)
+		:effect (and (parked ?v ?to) (not (parked ?v ?from)))))
+"""
+
+FLEET_PROBLEM = """(define (problem fleet-1)
+	(:domain fleet)
+	(:objects mini - car lorry - truck depot garage - place)
+	(:init (parked mini depot) (parked lorry garage))
+	(:goal (parked mini garage)))
+"""
+
+# Journeys need two connected roads, and may not end in a closed town.
+ROADS_DOMAIN = """(define (domain roads)
+	(:requirements :typing :strips)
+	(:types town)
+	(:predicates (at ?t - town) (road ?from ?to - town) (closed ?t - town) (loop ?t - town ?u - town))
+	(:action journey
+		:parameters (?from ?via ?to - town)
+		:precondition (and (at ?from) (road ?from ?via) (road ?via ?to) (not (closed ?to)))
+		:effect (and (at ?to) (not (at ?from))))
+	(:action circle
+		:parameters (?t - town)
+		:precondition (and (at ?t) (loop ?t ?t))
+		:effect (and (at ?t))))
+"""
+
+ROADS_PROBLEM = """(define (problem roads-1)
+	(:domain roads)
+	(:objects a b c d - town)
+	(:init (at a) (road a b) (road b c) (road b d) (road c a) (closed d) (loop a b) (loop c c))
+	(:goal (at c)))
+"""
+
+# Trucks are at one place, and packages are either at one place or in one truck.
+LOGISTICS_DOMAIN = """(define (domain logi)
+	(:requirements :typing :strips :non-deterministic)
+	(:types place package truck)
+	(:predicates (truck-at ?t - truck ?p - place) (pkg-at ?k - package ?p - place) (in ?k - package ?t - truck) (road ?a ?b - place) (free ?t - truck) (slow ?t - truck))
+	(:action drive
+		:parameters (?t - truck ?from ?to - place)
+		:precondition (and (truck-at ?t ?from) (road ?from ?to))
+		:effect (oneof (and (truck-at ?t ?to) (not (truck-at ?t ?from))) (slow ?t)))
+	(:action load
+		:parameters (?k - package ?t - truck ?p - place)
+		:precondition (and (truck-at ?t ?p) (pkg-at ?k ?p) (free ?t))
+		:effect (and (in ?k ?t) (not (pkg-at ?k ?p)) (not (free ?t))))
+	(:action unload
+		:parameters (?k - package ?t - truck ?p - place)
+		:precondition (and (truck-at ?t ?p) (in ?k ?t))
+		:effect (and (pkg-at ?k ?p) (not (in ?k ?t)) (free ?t))))
+"""
+
+LOGISTICS_PROBLEM = """(define (problem logi-1)
+	(:domain logi)
+	(:objects a b c - place k1 k2 - package t1 t2 - truck)
+	(:init (truck-at t1 a) (truck-at t2 c) (pkg-at k1 a) (pkg-at k2 b) (road a b) (road b a) (road b c) (road c b) (free t1) (free t2))
+	(:goal (and (pkg-at k1 c) (pkg-at k2 a))))
+"""
+
+def write_problem(directory, domain, problem):
+	domain_path = os.path.join(directory, "domain.pddl")
+	problem_path = os.path.join(directory, "p01.pddl")
+	with open(domain_path, "w") as f:
+		f.write(domain)
+	with open(problem_path, "w") as f:
+		f.write(problem)
+	return domain_path, problem_path
+
 TEST_DATA = os.path.join(THIS_DIR, os.pardir, "benchmarks", "domains")
 
 def dict_to_set(d, key_lambda = lambda x: x, value_lambda = lambda x: x):
@@ -50,6 +154,162 @@ class TestTranslatorComponenets(unittest.TestCase):
 			self.assertIn(a, expected_possibilities)
 		pass
 	
+	def test_c_symbols_match_ASP(self):
+		for instance_path in self.instance_paths[:4]:
+			with self.subTest(instance=os.path.basename(instance_path)):
+				t = Translator(self.domain_path, instance_path)
+				from_text = set(parse_term(r.strip()[:-1]) for r in t.as_ASP() if r.strip())
+				self.assertSetEqual(set(t.as_symbols()), from_text)
+		pass
+	
+	def test_d_shared_lifted_domain(self):
+		lifted = Translator.lift_domain(self.domain_path)
+		for instance_path in self.instance_paths[:4]:
+			with self.subTest(instance=os.path.basename(instance_path)):
+				shared = Translator(self.domain_path, instance_path, lifted=lifted)
+				alone = Translator(self.domain_path, instance_path)
+				self.assertIs(shared.domain, lifted.domain)
+				self.assertSetEqual(set(shared.as_ASP()), set(alone.as_ASP()))
+		pass
+	
+	def test_e_prune_unreachable(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			domain_path, problem_path = write_problem(tmp, VAULT_DOMAIN, VAULT_PROBLEM)
+			pruned = Translator(domain_path, problem_path)
+			unpruned = Translator(domain_path, problem_path, prune_unreachable=False)
+		
+		with self.subTest(part="actions"):
+			names = set(a.name for a in pruned.grounded_actions)
+			self.assertLess(len(pruned.grounded_actions), len(unpruned.grounded_actions))
+			self.assertFalse(any("unlock" in n or "take-key" in n for n in names))
+		
+		with self.subTest(part="values"):
+			_, lookup, _ = pruned.predicate_variable_lookup["at"]
+			position = lookup[()]
+			self.assertSetEqual(set(position.domain), {"hall", "kitchen"})
+		
+		with self.subTest(part="never true"):
+			# has-key can only be set by take-key, which is unreachable.
+			self.assertIn("has-key()", set(v.symbol for v in unpruned.variables))
+			self.assertNotIn("has-key()", set(v.symbol for v in pruned.variables))
+			self.assertFalse(any("has-key" in str(s) for s in pruned.as_symbols()))
+			self.assertEqual(pruned.constants, {"has-key()": "falseValue"})
+			
+			# Goals given later are folded in the same way.
+			pruned.overwrite_goal(Formula.parse("(at=kitchen)&!(has-key()=trueValue)"))
+			self.assertIs(pruned.converted_goal, Formula.parse("at=kitchen"))
+			pruned.overwrite_goal(Formula.parse("has-key()=trueValue"))
+			self.assertIs(pruned.converted_goal, Falsum())
+		
+		for instance_path in self.instance_paths[:4]:
+			with self.subTest(instance=os.path.basename(instance_path)):
+				# Every action in acrobatics is reachable.
+				pruned = Translator(self.domain_path, instance_path)
+				unpruned = Translator(self.domain_path, instance_path, prune_unreachable=False)
+				self.assertSetEqual(set(a.name for a in pruned.grounded_actions), set(a.name for a in unpruned.grounded_actions))
+		pass
+	
+	def test_f_indices(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			domain_path, problem_path = write_problem(tmp, FLEET_DOMAIN, FLEET_PROBLEM)
+			t = Translator(domain_path, problem_path)
+		
+		expected_types = {
+			"car": {"mini"},
+			"truck": {"lorry"},
+			"vehicle": {"mini", "lorry"},
+			"place": {"depot", "garage"},
+		}
+		for type_name, objects in expected_types.items():
+			with self.subTest(type=type_name):
+				self.assertSetEqual(set(o.name for o in t.type_index[type_name]), objects)
+		
+		with self.subTest(index="init"):
+			self.assertSetEqual(t.initial_names_index["parked"], {("mini", "depot"), ("lorry", "garage")})
+		
+		with self.subTest(index="effects"):
+			[e] = t.lifted.effect_predicates["parked"]
+			added, deleted, _ = t.lifted.effect_literals[e]
+			self.assertEqual(len(added), 1)
+			self.assertEqual(len(deleted), 1)
+		
+		with self.subTest(part="actions"):
+			# Every vehicle may drive between every pair of places.
+			self.assertEqual(len(t.grounded_actions), 8)
+		pass
+	
+	def test_g_join_grounding(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			domain_path, problem_path = write_problem(tmp, ROADS_DOMAIN, ROADS_PROBLEM)
+			t = Translator(domain_path, problem_path, prune_unreachable=False)
+		
+		expected = {"journey_a_c_b", "journey_b_a_c", "journey_c_b_a", "circle_c"}
+		self.assertSetEqual(set(a.name for a in t.grounded_actions), expected)
+		pass
+	
+	def test_h_invariant_variables(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			domain_path, problem_path = write_problem(tmp, LOGISTICS_DOMAIN, LOGISTICS_PROBLEM)
+			t = Translator(domain_path, problem_path)
+		
+		variables = dict((v.symbol, set(v.domain)) for v in t.variables)
+		initial = dict((var.symbol, val.symbol) for var, val in t.initial_values)
+		
+		expected = {
+			"truck-at(t1)": ({"a", "b", "c"}, "a"),
+			"truck-at(t2)": ({"a", "b", "c"}, "c"),
+			"in/pkg-at(k1)": ({"pkg-at(a)", "pkg-at(b)", "pkg-at(c)", "in(t1)", "in(t2)"}, "pkg-at(a)"),
+			"in/pkg-at(k2)": ({"pkg-at(a)", "pkg-at(b)", "pkg-at(c)", "in(t1)", "in(t2)"}, "pkg-at(b)"),
+		}
+		for symbol, (domain, value) in expected.items():
+			with self.subTest(variable=symbol):
+				self.assertSetEqual(variables[symbol], domain)
+				self.assertEqual(initial[symbol], value)
+		
+		with self.subTest(part="booleans"):
+			# free is deleted without being replaced, so it stays boolean.
+			self.assertIn("free(t1)", variables)
+			self.assertFalse(any(s.startswith("truck-at(t1,") or s.startswith("pkg-at(") for s in variables))
+		pass
+	
+	def test_i_integer_symbols(self):
+		"""
+		Tests naming by integers gives the same facts, once the names are put back.
+		"""
+		domain_dir = os.path.join(TEST_DATA, "acrobatics")
+		t = Translator(os.path.join(domain_dir, "domain.pddl"), os.path.join(domain_dir, "p02.pddl"))
+		encoded = list(t.as_integer_symbols())
+		
+		self.assertNotIn('"', "".join(str(s) for s in encoded))
+		for g in list(t.grounded_actions) + list(t.grounded_effects):
+			self.assertIn(g.name, t.symbols.ids)
+		
+		names = t.symbols.names
+		def restore(s):
+			if s.type == SymbolType.Number:
+				return String(names[s.number])
+			if s.type == SymbolType.Function:
+				return Function(s.name, [restore(a) for a in s.arguments], s.positive)
+			return s
+		
+		self.assertSetEqual(set(restore(s) for s in encoded), set(t.as_symbols()))
+		pass
+	
+	def test_j_streaming(self):
+		"""
+		Tests streamed instances hold the same facts as unpruned ones, without keeping the actions.
+		"""
+		with tempfile.TemporaryDirectory() as tmp:
+			vault = write_problem(tmp, VAULT_DOMAIN, VAULT_PROBLEM)
+			for domain_path, problem_path in [vault] + [(self.domain_path, p) for p in self.instance_paths[:4]]:
+				with self.subTest(instance=os.path.basename(problem_path)):
+					unpruned = Translator(domain_path, problem_path, prune_unreachable=False)
+					streamed = Translator(domain_path, problem_path, streaming=True)
+					self.assertEqual(len(streamed.grounded_actions), 0)
+					self.assertEqual(len(streamed.grounded_effects), 0)
+					self.assertSetEqual(set(streamed.as_ASP()) - {"\n"}, set(unpruned.as_ASP()) - {"\n"})
+					self.assertSetEqual(set(streamed.as_symbols()), set(unpruned.as_symbols()))
+		pass
 	
 
 if __name__ == "__main__":